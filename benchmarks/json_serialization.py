@@ -0,0 +1,103 @@
+"""Ro'yxat endpointlarini ikki usulda serializatsiya qilish tezligini solishtiradi:
+
+    legacy - qatorlardan qo'lda dict yig'ish + response_model orqali qayta tekshirish
+    fast   - utils.fast_json.json_list (orjson, response_model tekshiruvisiz)
+
+Vaqtinchalik bazada management jadvali to'ldiriladi, so'rovlar ASGI orqali (tarmoqsiz) yuboriladi:
+
+    python benchmarks/json_serialization.py --rows 100 1000 10000 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fill(database: str, rows: int):
+    conn = sqlite3.connect(database)
+    conn.execute("DROP TABLE IF EXISTS management")
+    conn.execute("""
+        CREATE TABLE management (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image TEXT,
+            position TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            specialty TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO management (image, position, full_name, phone, email, specialty) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"/uploads/management/{i}.jpg", "Bo'lim boshlig'i", f"Xodim {i}", "+998 71 000 00 00",
+          f"user{i}@tmsiti.uz", "Qurilish me'yorlari") for i in range(rows)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def build_app():
+    from fastapi import Depends, FastAPI
+    from dependencies import get_db
+    from schemas.institute import ManagementResponse
+    from utils.fast_json import json_list
+
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=List[ManagementResponse])
+    async def legacy(db=Depends(get_db)):
+        items = await db.fetchall("SELECT * FROM management")
+        return [{"id": item["id"], "image": item["image"], "position": item["position"], "full_name": item["full_name"], "phone": item["phone"], "email": item["email"], "specialty": item["specialty"]} for item in items]
+
+    @app.get("/fast", response_model=List[ManagementResponse])
+    async def fast(db=Depends(get_db)):
+        return await json_list(db, ManagementResponse, "management")
+
+    return app
+
+
+async def measure(app, path: str, requests: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.get(path)).raise_for_status()
+        started = time.perf_counter()
+        for _ in range(requests):
+            (await client.get(path)).raise_for_status()
+        return (time.perf_counter() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "tmsiti.db")
+    os.environ["DATABASE_PATH"] = database
+    sys.path.insert(0, ROOT)
+    fill(database, 0)
+    app = build_app()
+
+    print(f"{'rows':>8} {'legacy ms':>10} {'fast ms':>10} {'speedup':>8}")
+    try:
+        for rows in args.rows:
+            fill(database, rows)
+            legacy = asyncio.run(measure(app, "/legacy", args.requests))
+            fast = asyncio.run(measure(app, "/fast", args.requests))
+            print(f"{rows:>8} {legacy * 1000:>10.2f} {fast * 1000:>10.2f} {legacy / fast:>7.1f}x")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
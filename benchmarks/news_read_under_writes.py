@@ -0,0 +1,117 @@
+"""/news/news o'qish tezligini parallel admin yozuvlari fonida o'lchaydi.
+
+Har bir saqlash profili alohida jarayonda, vaqtinchalik baza nusxasida ishga tushadi:
+
+    python benchmarks/news_read_under_writes.py --duration 10 --readers 8
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "rollback-journal": {"DB_JOURNAL_MODE": "DELETE", "DB_SYNCHRONOUS": "FULL", "DB_MMAP_SIZE": "0",
+                         "DB_CACHE_SIZE": "-2000", "DB_TEMP_STORE": "DEFAULT", "DB_BUSY_TIMEOUT": "5000"},
+    "wal": {"DB_JOURNAL_MODE": "WAL"},
+}
+
+
+def run_profile(args):
+    import uvicorn
+    import httpx
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import main
+    from dependencies import create_access_token
+
+    main.init_db()
+    main.update_db_schema()
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{args.port}"
+    token = create_access_token({"sub": "admin", "role": "admin"})
+    stop = threading.Event()
+    reads, writes, errors = [0], [0], [0]
+    lock = threading.Lock()
+
+    def reader():
+        with httpx.Client(base_url=base) as client:
+            while not stop.is_set():
+                response = client.get("/news/news", params={"page": 1, "size": 20})
+                with lock:
+                    if response.status_code == 200:
+                        reads[0] += 1
+                    else:
+                        errors[0] += 1
+
+    def writer():
+        headers = {"Authorization": f"Bearer {token}"}
+        with httpx.Client(base_url=base, headers=headers) as client:
+            while not stop.is_set():
+                response = client.post("/news/news", data={"title": "bench", "content": "x" * 2000, "date": "2025-01-01"})
+                with lock:
+                    if response.status_code == 200:
+                        writes[0] += 1
+                    else:
+                        errors[0] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.should_exit = True
+    print(json.dumps({
+        "reads_per_sec": reads[0] / args.duration,
+        "writes_per_sec": writes[0] / args.duration,
+        "errors": errors[0],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", choices=PROFILES)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+
+    for name, overrides in PROFILES.items():
+        workdir = tempfile.mkdtemp()
+        try:
+            database = os.path.join(workdir, "tmsiti.db")
+            shutil.copy(os.path.join(ROOT, "tmsiti.db"), database)
+            env = {**os.environ, **overrides, "DATABASE_PATH": database}
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--profile", name,
+                 "--duration", str(args.duration), "--readers", str(args.readers),
+                 "--writers", str(args.writers), "--port", str(args.port)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            print(f"{name:18} {result.stdout.strip().splitlines()[-1]}")
+        finally:
+            shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
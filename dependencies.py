@@ -2,39 +2,109 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Optional
 import os
 from dotenv import load_dotenv
 import json
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from utils.async_db import AsyncDB
+from utils.db_pool import ConnectionPool, PoolTimeout, parse_pragmas, connection_pragmas
+from utils.user_cache import user_cache
+from utils.password_hasher import PasswordHasher
+from utils.login_throttle import LoginThrottle
 
 load_dotenv()
 
+# Ma'lumotlar bazasi sozlamalari
+DATABASE_PATH = os.getenv("DATABASE_PATH", "tmsiti.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_PRAGMAS = parse_pragmas(os.getenv("DB_PRAGMAS", ""))
+
+# Saqlash profili: WAL rejimida o'quvchilar admin yozuvlari tugashini kutmaydi
+STORAGE_PROFILE = {
+    "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("DB_CACHE_SIZE", "-16000"),
+    "temp_store": os.getenv("DB_TEMP_STORE", "MEMORY"),
+    "busy_timeout": os.getenv("DB_BUSY_TIMEOUT", "5000"),
+    # Normalar, guruhlar va hujjatlar o'rtasidagi bog'lanishlar (utils.migrations, 3-migratsiya)
+    "foreign_keys": os.getenv("DB_FOREIGN_KEYS", "ON"),
+}
+
+db_pool = ConnectionPool(
+    DATABASE_PATH,
+    max_size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    pragmas={**connection_pragmas(STORAGE_PROFILE), **DB_PRAGMAS},
+)
+
+# So'rovlar uchun alohida oqimlar havzasi: har bir ulanishga bitta oqim yetadi
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
 # JWT sozlamalari
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Tekshirilgan tokenlar va users yozuvlari keshi (soniya)
+user_cache.ttl = float(os.getenv("AUTH_CACHE_TTL", "60"))
 
 # Parolni shifrlash uchun
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt alohida chegaralangan havzada: bir vaqtda AUTH_HASH_WORKERS ta hisob, navbatda AUTH_HASH_QUEUE tagacha
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=int(os.getenv("AUTH_HASH_WORKERS", "2")),
+    max_pending=int(os.getenv("AUTH_HASH_QUEUE", "32")),
+)
+
+# Login urinishlarini cheklash (har bir worker o'zida hisoblaydi)
+LOGIN_WINDOW = float(os.getenv("LOGIN_WINDOW", "300"))
+login_user_throttle = LoginThrottle(int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_USER", "5")), LOGIN_WINDOW)
+login_ip_throttle = LoginThrottle(int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "20")), LOGIN_WINDOW)
 
 # Tokenni HTTPBearer orqali olish
 oauth2_scheme = HTTPBearer()
 
-def get_db():
-    conn = sqlite3.connect("tmsiti.db", check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+@asynccontextmanager
+async def db_session():
+    loop = asyncio.get_running_loop()
+    # Ulanishni kutish db_executor oqimlarini band qilmasligi uchun standart havzada bajariladi
+    acquiring = loop.run_in_executor(None, db_pool.acquire)
+    try:
+        conn = await asyncio.shield(acquiring)
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Database is busy, try again later")
+    except asyncio.CancelledError:
+        # So'rov kutish paytida bekor qilindi: oqim baribir olgan ulanish havzaga qaytariladi
+        acquiring.add_done_callback(_release_acquired)
+        raise
+    db = AsyncDB(conn, db_executor)
     try:
-        yield conn
+        yield db
     finally:
-        conn.close()
+        try:
+            await asyncio.shield(db.finish())
+        finally:
+            await asyncio.shield(loop.run_in_executor(db_executor, db_pool.release, conn))
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def _release_acquired(future):
+    if not future.cancelled() and future.exception() is None:
+        db_pool.release(future.result())
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_db():
+    async with db_session() as db:
+        yield db
+
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -43,36 +113,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(username: str, password: str, db):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    if not user or not verify_password(password, user["password"]):
+async def authenticate_user(username: str, password: str):
+    # Ulanish faqat so'rov vaqtida olinadi: bcrypt kutayotgan login ulanishlar havzasini band qilmaydi
+    async with db_session() as db:
+        user = await db.fetchone("SELECT * FROM users WHERE username = ?", (username,))
+    if not user:
+        await password_hasher.dummy_verify()
+        return False
+    if not await verify_password(password, user["password"]):
         return False
     return user
 
-async def get_current_user(
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
-    db: sqlite3.Connection = Depends(get_db)
-):
+async def get_current_user(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    # Tekshirilgan token keshda bo'lsa, JWT qayta dekodlanmaydi
+    username = user_cache.token_subject(token.credentials)
+    if username is None:
+        try:
+            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        user_cache.remember_token(token.credentials, username, payload.get("exp"))
 
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
+    user = user_cache.user(username)
     if user is None:
-        raise credentials_exception
+        generation = user_cache.generation
+        # So'rov davomida ulanish band qilinmaydi: handlerga kerak bo'lsa, o'zi get_db orqali oladi
+        async with db_session() as db:
+            user = await db.fetchone("SELECT * FROM users WHERE username = ?", (username,))
+        if user is None:
+            raise credentials_exception
+        user_cache.remember_user(username, user, generation)
     return user
 
 async def get_current_admin(user: dict = Depends(get_current_user)):
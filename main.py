@@ -1,11 +1,64 @@
 from fastapi import FastAPI
-from routers import auth, institute, documents, news, contact
+from routers import auth, institute, documents, news, contact, uploads, batch
 import sqlite3
 from fastapi.middleware.cors import CORSMiddleware
-from dependencies import get_db
+from dependencies import get_db, db_pool, DATABASE_PATH, STORAGE_PROFILE, password_hasher, login_user_throttle, login_ip_throttle
+from utils.db_pool import apply_storage_profile
+from utils.pdf_index import PdfIndexer
+from utils.file_upload import get_upload_stats
+from utils.response_cache import response_cache, use_cache_backend
+from utils.cache_backend import MemoryBackend, SQLiteBackend, default_cache_dir
+from utils.cache_bus import CacheBus
+from utils.user_cache import user_cache
+from utils.norm_tree import norm_tree
+from utils.migrations import migrate
+from utils.jobs import JobRunner
+from utils.images import enqueue_missing_derivatives
+from utils.notifications import NotificationDispatcher, StubTransport, TelegramTransport
+import os
 
 app = FastAPI()
 
+# Yuklangan PDF'lardan matn ajratib, qidiruv indeksiga qo'shuvchi fon jarayoni
+pdf_indexer = PdfIndexer(
+    db_pool,
+    workers=int(os.getenv("PDF_INDEX_WORKERS", "2")),
+    interval=float(os.getenv("PDF_INDEX_INTERVAL", "300")),
+)
+
+# So'rovdan keyingi ishlar navbati (utils.jobs)
+job_runner = JobRunner(
+    db_pool,
+    concurrency=int(os.getenv("JOB_CONCURRENCY", "4")),
+    drain_timeout=float(os.getenv("JOB_DRAIN_TIMEOUT", "20")),
+)
+
+# Telegram bildirishnomalari outbox'i. NOTIFY_TRANSPORT=stub - xabarlar tarmoqqa chiqmaydi (lokal/test)
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+if os.getenv("NOTIFY_TRANSPORT", "telegram" if BOT_TOKEN else "stub") == "telegram":
+    notification_transport = TelegramTransport(BOT_TOKEN)
+else:
+    notification_transport = StubTransport()
+notification_dispatcher = NotificationDispatcher(
+    db_pool,
+    notification_transport,
+    digest_threshold=int(os.getenv("NOTIFY_DIGEST_THRESHOLD", "3")),
+    send_interval=float(os.getenv("NOTIFY_SEND_INTERVAL", "1")),
+    max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8")),
+)
+
+# Ochiq GET javoblari keshi (utils.response_cache).
+# CACHE_BACKEND=sqlite - bir nechta uvicorn workeri uchun umumiy kesh (/dev/shm dagi fayl)
+CACHE_DIR = os.getenv("CACHE_DIR", default_cache_dir(DATABASE_PATH))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+if os.getenv("CACHE_BACKEND", "memory") == "sqlite":
+    use_cache_backend(SQLiteBackend(os.path.join(CACHE_DIR, "responses.db"), max_entries=RESPONSE_CACHE_SIZE))
+else:
+    use_cache_backend(MemoryBackend(max_entries=RESPONSE_CACHE_SIZE))
+response_cache.ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# Workerlar o'rtasida jadval o'zgarishlarini tarqatish (jarayon ichidagi keshlarni tozalash uchun)
+cache_bus = CacheBus(os.path.join(CACHE_DIR, "bus"))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,138 +72,59 @@ app.include_router(institute.router)
 app.include_router(documents.router)
 app.include_router(news.router)
 app.include_router(contact.router)
+app.include_router(uploads.router)
+app.include_router(batch.router)
 
 def init_db():
-    with sqlite3.connect("tmsiti.db") as db:
-        cursor = db.cursor()
-        # Contacts jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS contacts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                subject TEXT NOT NULL,
-                message TEXT NOT NULL,
-                file TEXT
-            )
-        """)
-        # Users jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL
-            )
-        """)
-        # Institute info jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS institute_info (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                content TEXT NOT NULL,
-                charter_pdf TEXT,
-                statute_pdf TEXT
-            )
-        """)
-        # Management jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS management (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image TEXT,
-                position TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                phone TEXT,
-                email TEXT,
-                specialty TEXT
-            )
-        """)
-        # Structure jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS structure (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image TEXT NOT NULL
-            )
-        """)
-        # Departments jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS departments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image TEXT,
-                name TEXT NOT NULL,
-                head TEXT NOT NULL,
-                head_phone TEXT,
-                head_email TEXT
-            )
-        """)
-        # Vacancies jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vacancies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                position TEXT NOT NULL,
-                department TEXT NOT NULL,
-                requirements TEXT NOT NULL,
-                status TEXT NOT NULL
-            )
-        """)
-        # Announcements jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS announcements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                date TEXT NOT NULL,
-                image TEXT,
-                link TEXT
-            )
-        """)
-        # News jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS news (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                date TEXT NOT NULL,
-                image TEXT
-            )
-        """)
-        # Anticorruption jadvali
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS anticorruption (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                minister_message TEXT,
-                date TEXT NOT NULL,
-                image TEXT,
-                document_link TEXT,
-                telegram_link TEXT
-            )
-        """)
+    with sqlite3.connect(DATABASE_PATH) as db:
+        apply_storage_profile(db, STORAGE_PROFILE)
+        # Jadvallar, indekslar va sxema o'zgarishlari utils.migrations da (schema_version jadvali)
+        migrate(db)
+        # Ilgari yuklangan rasmlarning kichraytirilgan nusxalari navbatga qo'yiladi
+        enqueue_missing_derivatives(db)
         # Default admin
-        cursor.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
-                      ("admin", "$2b$12$cuzkTEoOTLv9RI45wvJWOu4zmyZl78Jpv8R0yI/os8NdV557U9rLi", "admin"))
-        db.commit()
-
-def update_db_schema():
-    with sqlite3.connect("tmsiti.db") as db:
-        cursor = db.cursor()
-        # Subject ustunini qo'shish
-        try:
-            cursor.execute("ALTER TABLE contacts ADD COLUMN subject TEXT NOT NULL DEFAULT ''")
-        except sqlite3.OperationalError:
-            pass  # Ustun allaqachon mavjud bo'lsa
-        # File ustunini qo'shish
-        try:
-            cursor.execute("ALTER TABLE contacts ADD COLUMN file TEXT")
-        except sqlite3.OperationalError:
-            pass  # Ustun allaqachon mavjud bo'lsa
+        db.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
+                   ("admin", "$2b$12$cuzkTEoOTLv9RI45wvJWOu4zmyZl78Jpv8R0yI/os8NdV557U9rLi", "admin"))
         db.commit()
 
 @app.on_event("startup")
 async def startup_event():
     init_db()
-    update_db_schema()
+    pdf_indexer.start()
+    notification_dispatcher.start()
+    job_runner.start()
+    await cache_bus.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await cache_bus.stop()
+    # Bajarilayotgan vazifalar tugashi kutiladi, keyin ulanishlar yopiladi
+    await job_runner.stop()
+    await pdf_indexer.stop()
+    await notification_dispatcher.stop()
+    password_hasher.shutdown()
+    db_pool.close()
+
+# Monitoring uchun metrikalar
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "db_pool": db_pool.stats(),
+        "pdf_index": pdf_indexer.stats,
+        "uploads": get_upload_stats(),
+        "response_cache": await response_cache.stats(),
+        "cache_bus": cache_bus.stats,
+        "notifications": notification_dispatcher.stats,
+        "jobs": {**job_runner.stats, "running": job_runner.running()},
+        "auth_cache": user_cache.stats(),
+        "norm_tree": norm_tree.stats(),
+        "auth": {
+            **password_hasher.stats,
+            "pending": password_hasher.pending(),
+            "throttled_users": login_user_throttle.stats(),
+            "throttled_ips": login_ip_throttle.stats(),
+        },
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,18 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from typing import Optional
-import sqlite3
-from passlib.context import CryptContext
-from dependencies import get_db, get_current_admin, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.async_db import AsyncDB
+from dependencies import (
+    get_db, db_session, get_current_admin, authenticate_user, get_password_hash, login_user_throttle, login_ip_throttle,
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+)
+from utils.db_events import table_changed
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-# Parolni shifrlash uchun
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Foydalanuvchi modeli
 class User(BaseModel):
     username: str
@@ -23,13 +23,6 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
-# Parolni shifrlash va tekshirish
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 # JWT token yaratish
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -38,23 +31,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Foydalanuvchini autentifikatsiya qilish
-def authenticate_user(username: str, password: str, db):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    if not user or not verify_password(password, user["password"]):
-        return False
-    return user
-
 # Token olish uchun endpoint
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: sqlite3.Connection = Depends(get_db)
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
-    if not user:
+    # Proksi ortida mijoz IP'si uvicorn --proxy-headers orqali olinadi
+    user_key = form_data.username.casefold()
+    ip_key = request.client.host if request.client else "unknown"
+    retry_after = max(login_user_throttle.retry_after(user_key), login_ip_throttle.retry_after(ip_key))
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    user_attempt = login_user_throttle.attempt(user_key)
+    ip_attempt = login_ip_throttle.attempt(ip_key)
+    try:
+        user = await authenticate_user(form_data.username, form_data.password)
+    except HTTPException:
+        # Havza band (503): parol tekshirilmadi, urinish hisobga olinmaydi
+        login_user_throttle.succeeded(user_key, user_attempt)
+        login_ip_throttle.succeeded(ip_key, ip_attempt)
+        raise
+    if user:
+        login_user_throttle.succeeded(user_key, user_attempt, forget_all=True)
+        login_ip_throttle.succeeded(ip_key, ip_attempt)
+    else:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -70,28 +75,26 @@ async def login_for_access_token(
 @router.post("/register")
 async def register_user(
     user: User,
-    current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_admin)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ?", (user.username,))
-    if cursor.fetchone():
-        raise HTTPException(status_code=400, detail="Username already exists")
-    hashed_password = get_password_hash(user.password)
-    cursor.execute(
-        "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-        (user.username, hashed_password, user.role)
-    )
-    db.commit()
+    # Ulanish bcrypt hisobidan keyin olinadi: hisob paytida havzadan ulanish band qilinmaydi
+    hashed_password = await get_password_hash(user.password)
+    async with db_session() as db:
+        if await db.fetchone("SELECT 1 FROM users WHERE username = ?", (user.username,)):
+            raise HTTPException(status_code=400, detail="Username already exists")
+        await db.execute(
+            "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+            (user.username, hashed_password, user.role)
+        )
+        await db.commit()
+    table_changed("users")
     return {"message": f"User {user.username} created successfully"}
 
 # Admin endpointi: foydalanuvchilar ro‘yxati
 @router.get("/users")
 async def get_users(
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT username, role FROM users")
-    users = cursor.fetchall()
+    users = await db.fetchall("SELECT username, role FROM users")
     return [{"username": user["username"], "role": user["role"]} for user in users]
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+from schemas.batch import BatchRequest, BatchResponse
+from dependencies import get_db, get_current_admin
+from utils.async_db import AsyncDB
+from utils.batch_ops import apply_operations
+from utils.db_events import table_changed
+
+router = APIRouter(tags=["batch"])
+
+# Paket orqali o'zgartirish mumkin bo'lgan jadvallar: (yoziladigan ustunlar, fayl ustunlari).
+# Fayllar odatdagi endpointlar orqali yuklanadi; paketda faqat matnli maydonlar.
+BATCH_RESOURCES = {
+    "institute_info": (("content",), ("charter_pdf", "statute_pdf")),
+    "management": (("position", "full_name", "phone", "email", "specialty"), ("image",)),
+    "structure": ((), ("image",)),
+    "departments": (("name", "head", "head_phone", "head_email"), ("image",)),
+    "announcements": (("title", "content", "date", "link"), ("image",)),
+    "news": (("title", "content", "date"), ("image",)),
+    "anticorruption": (("title", "content", "minister_message", "date", "telegram_link"), ("image", "document_link")),
+    "laws": (("name", "order_number", "adopted_date", "effective_date", "issuing_authority"), ("link",)),
+    "urban_norms": (("norm_name",), ()),
+    "norm_groups": (("norm_id", "group_name"), ()),
+    "norm_documents": (("norm_id", "group_id", "code", "name"), ("link",)),
+    "standards": (("code", "name"), ("pdf_link",)),
+    "regulations": (("code", "name"), ("pdf_link",)),
+    "resource_norms": (("code", "name"), ("pdf_link",)),
+    "reference_docs": (("name",), ("pdf_link",)),
+}
+
+@router.post("/batch", response_model=BatchResponse)
+async def apply_batch(
+    batch: BatchRequest,
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncDB = Depends(get_db)
+):
+    # Bitta autentifikatsiya, bitta ulanish va bitta commit
+    result = await db.run(apply_operations, BATCH_RESOURCES, batch.operations, batch.atomic)
+    if result["tables"]:
+        table_changed(*result["tables"], *(("jobs",) if result["released"] else ()))
+    return {"committed": result["committed"], "results": result["results"]}
@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
-from schemas.contact import ContactCreate, ContactResponse
-import sqlite3
+from fastapi import APIRouter, Depends, Form, File, UploadFile, Query
+from schemas.contact import ContactResponse
+from utils.async_db import AsyncDB
 from dependencies import get_db
-from aiogram import Bot
-from aiogram.enums import ParseMode
+import logging
 import os
 from dotenv import load_dotenv
 from utils.file_upload import save_file
+from utils.fast_json import stream_rows
+from utils.db_events import table_changed
+from utils.notifications import enqueue_notification
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Bildirishnomalar qabul qiluvchisi
+TELEGRAM_USER_ID = os.getenv("TELEGRAM_USER_ID")
+
 router = APIRouter(prefix="/contact", tags=["contact"])
 
+def _store_contact(conn, values: tuple, chat_id, text: str) -> int:
+    # Xabar, yuklangan fayl va Telegram bildirishnomasi bitta tranzaksiyada saqlanadi
+    # (xato bo'lsa db_session tranzaksiyani bekor qiladi va joylangan faylni tozalaydi)
+    cursor = conn.execute(
+        "INSERT INTO contacts (name, email, subject, message, file) VALUES (?, ?, ?, ?, ?)",
+        values
+    )
+    if chat_id:
+        enqueue_notification(conn, chat_id, text)
+    conn.commit()
+    return cursor.lastrowid
+
 @router.post("/send", response_model=ContactResponse)
 async def send_contact_message(
     name: str = Form(...),
@@ -19,47 +38,26 @@ async def send_contact_message(
     subject: str = Form(...),
     message: str = Form(...),
     file: UploadFile = File(None),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    file_path = await save_file(file, ["pdf"], "uploads/contact") if file else None
-    cursor = db.cursor()
-    cursor.execute(
-        "INSERT INTO contacts (name, email, subject, message, file) VALUES (?, ?, ?, ?, ?)",
-        (name, email, subject, message, file_path)
+    file_path = await save_file(db, file, ["pdf"], "uploads/contact") if file else None
+    message_text = (
+        f"Yangi xabar keldi!\n"
+        f"Ism: {name}\n"
+        f"Email: {email}\n"
+        f"Mavzu: {subject}\n"
+        f"Xabar: {message}\n"
+        f"Fayl: {file_path if file_path else 'Yo‘q'}"
     )
-    db.commit()
-    
-    bot_token = os.getenv("BOT_TOKEN")
-    telegram_user_id = os.getenv("TELEGRAM_USER_ID")
-    
-    if not bot_token or not telegram_user_id:
-        raise HTTPException(status_code=500, detail="Telegram bot sozlamalari topilmadi")
-    
-    bot = Bot(token=bot_token)
-    try:
-        message_text = (
-            f"Yangi xabar keldi!\n"
-            f"Ism: {name}\n"
-            f"Email: {email}\n"
-            f"Mavzu: {subject}\n"
-            f"Xabar: {message}\n"
-            f"Fayl: {file_path if file_path else 'Yo‘q'}"
-        )
-        # Markdown o'rniga oddiy matn sifatida yuborish
-        await bot.send_message(
-            chat_id=telegram_user_id,
-            text=message_text
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Telegram bot xatosi: {str(e)}")
-    finally:
-        await bot.session.close()
-    
-    return {"id": cursor.lastrowid, "name": name, "email": email, "subject": subject, "message": message, "file": file_path}
+    if not TELEGRAM_USER_ID:
+        logger.warning("TELEGRAM_USER_ID is not set, contact message is not forwarded to Telegram")
+    # Telegram'ga yuborishni fon dispetcheri bajaradi (utils.notifications): foydalanuvchi kutmaydi
+    id = await db.run(_store_contact, (name, email, subject, message, file_path), TELEGRAM_USER_ID, message_text)
+    if TELEGRAM_USER_ID:
+        table_changed("notification_outbox")
+    return {"id": id, "name": name, "email": email, "subject": subject, "message": message, "file": file_path}
 
 @router.get("/messages", response_model=list[ContactResponse])
-async def get_contact_messages(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM contacts")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "name": item["name"], "email": item["email"], "subject": item["subject"], "message": item["message"], "file": item["file"]} for item in items]
\ No newline at end of file
+async def get_contact_messages(format: str = Query("json", pattern="^(json|ndjson)$")):
+    # Javob oqim sifatida yuboriladi: format=ndjson - har bir qatorda bitta xabar
+    return stream_rows(ContactResponse, "contacts", ndjson=format == "ndjson")
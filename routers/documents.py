@@ -1,21 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile
-from typing import List
-import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile, Query
+from typing import List, Optional
+from utils.async_db import AsyncDB
 from dependencies import get_db, get_current_admin
 from schemas.documents import (
-    LawCreate, LawResponse,
+    LawResponse,
     UrbanNormCreate, UrbanNormResponse,
     NormGroupCreate, NormGroupResponse,
-    NormDocumentCreate, NormDocumentResponse,
-    StandardCreate, StandardResponse,
-    RegulationCreate, RegulationResponse,
-    ResourceNormCreate, ResourceNormResponse,
-    ReferenceDocCreate, ReferenceDocResponse
+    NormDocumentResponse, UrbanNormTree,
+    StandardResponse,
+    RegulationResponse,
+    ResourceNormResponse,
+    ReferenceDocResponse,
+    DocumentSearchResult,
+    LawImport, NormDocumentImport, CodedDocumentImport, ImportResult, AttachResult
 )
-from fastapi_pagination import Page, paginate
-from utils.file_upload import save_file
+from schemas.pagination import Page
+from utils.pagination import PageParams, paginate, prefix_range, count_cache
+from utils.search import SEARCH_SOURCES, build_match_query, count_documents, search_documents
+from utils.db_events import table_changed
+from utils.response_cache import CachedRoute, cached
+from utils.fast_json import JSONBytesResponse, json_list, json_page, stream_rows
+from utils.bulk_import import import_format, import_rows, attach_archive, IMPORT_FORMATS
+import zipfile
+from utils.http_cache import versioned
+from utils.file_upload import save_file, release_file
+from utils.norm_tree import NORM_TREE_TABLES, norm_tree
 
-router = APIRouter(prefix="/documents", tags=["documents"])
+router = APIRouter(prefix="/documents", tags=["documents"], route_class=CachedRoute)
+
+# Kod prefiksi bo'yicha filtr: (code, id) indeksidan foydalanadi
+def code_filter(code: Optional[str], column: str = "code"):
+    return prefix_range(column, code) if code else ("", ())
+
+@router.get("/search", response_model=Page[DocumentSearchResult])
+async def search_all_documents(
+    q: str = Query(..., min_length=1),
+    source: Optional[str] = Query(None),
+    in_body: bool = Query(False),
+    params: PageParams = Depends(),
+    db: AsyncDB = Depends(get_db)
+):
+    if source and source not in SEARCH_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source. Allowed: {list(SEARCH_SOURCES)}")
+    if params.cursor:
+        raise HTTPException(status_code=400, detail="Search results are paginated by page and size only")
+    match = build_match_query(q, in_body)
+    if not match:
+        return {"items": [], "total": 0, "page": params.page, "size": params.size, "pages": 0}
+    total = count_cache.get("documents_fts", source or "", (match,))
+    if total is None:
+        generation = count_cache.generation("documents_fts")
+        total = await db.run(count_documents, match, source)
+        count_cache.set("documents_fts", source or "", (match,), total, generation)
+    items = await db.run(search_documents, match, params.size, (params.page - 1) * params.size, source)
+    return {
+        "items": items,
+        "total": total,
+        "page": params.page,
+        "size": params.size,
+        "pages": -(-total // params.size)
+    }
 
 @router.post("/laws", response_model=LawResponse)
 async def create_law(
@@ -26,15 +70,15 @@ async def create_law(
     issuing_authority: str = Form(...),
     link: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    link_path = await save_file(link, ["pdf"], "uploads/laws")
-    cursor = db.cursor()
-    cursor.execute(
+    link_path = await save_file(db, link, ["pdf"], "uploads/laws")
+    cursor = await db.execute(
         "INSERT INTO laws (name, order_number, adopted_date, effective_date, issuing_authority, link) VALUES (?, ?, ?, ?, ?, ?)",
         (name, order_number, adopted_date, effective_date, issuing_authority, link_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("laws")
     return {
         "id": cursor.lastrowid,
         "name": name,
@@ -45,22 +89,107 @@ async def create_law(
         "link": link_path
     }
 
-@router.get("/laws", response_model=List[LawResponse])
-async def get_laws(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM laws")
-    items = cursor.fetchall()
-    return [
-        {
-            "id": item["id"],
-            "name": item["name"],
-            "order_number": item["order_number"],
-            "adopted_date": item["adopted_date"],
-            "effective_date": item["effective_date"],
-            "issuing_authority": item["issuing_authority"],
-            "link": item["link"]
-        } for item in items
-    ]
+# Hujjatlar reyestrini to'liq eksport qilish (oqim, JSON massiv yoki NDJSON)
+EXPORT_MODELS = {
+    "laws": LawResponse,
+    "norm_documents": NormDocumentResponse,
+    "standards": StandardResponse,
+    "regulations": RegulationResponse,
+    "resource_norms": ResourceNormResponse,
+    "reference_docs": ReferenceDocResponse,
+}
+
+@router.get("/export/{source}")
+async def export_documents(source: str, format: str = Query("json", pattern="^(json|ndjson)$")):
+    if source not in EXPORT_MODELS:
+        raise HTTPException(status_code=404, detail=f"Unknown source. Allowed: {list(EXPORT_MODELS)}")
+    return stream_rows(EXPORT_MODELS[source], source, ndjson=format == "ndjson")
+
+# Reyestrga CSV yoki NDJSON fayldan ommaviy import (ustunlar - import modeli maydonlari)
+IMPORT_MODELS = {
+    "laws": LawImport,
+    "norm_documents": NormDocumentImport,
+    "standards": CodedDocumentImport,
+    "regulations": CodedDocumentImport,
+    "resource_norms": CodedDocumentImport,
+}
+
+def norm_group_check(conn):
+    groups = {(row[0], row[1]) for row in conn.execute("SELECT id, norm_id FROM norm_groups")}
+    return lambda item: None if (item.group_id, item.norm_id) in groups else "Norm group not found"
+
+@router.post("/import/{source}", response_model=ImportResult)
+async def import_documents(
+    source: str,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncDB = Depends(get_db)
+):
+    if source not in IMPORT_MODELS:
+        raise HTTPException(status_code=404, detail=f"Unknown source. Allowed: {list(IMPORT_MODELS)}")
+    fmt = import_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type. Allowed: {list(IMPORT_FORMATS)}")
+    prepare = norm_group_check if source == "norm_documents" else None
+    result = await db.run(import_rows, source, IMPORT_MODELS[source], file.file, fmt, prepare)
+    if result["inserted"]:
+        table_changed(source)
+    return result
+
+# ZIP arxivdagi PDF'larni kod bo'yicha biriktirish
+ATTACH_SOURCES = ("standards", "regulations", "norm_documents")
+
+@router.post("/attach/{source}", response_model=AttachResult)
+async def attach_documents(
+    source: str,
+    archive: UploadFile = File(...),
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncDB = Depends(get_db)
+):
+    if source not in ATTACH_SOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown source. Allowed: {list(ATTACH_SOURCES)}")
+    _, code_column, _, link_column = SEARCH_SOURCES[source]
+    try:
+        result = await db.run(attach_archive, source, code_column, link_column, archive.file, f"uploads/{source}")
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="File is not a ZIP archive")
+    if result["attached"]:
+        table_changed(source)
+    if result["replaced"]:
+        # Almashtirilgan fayllarni bo'shatish vazifalari
+        table_changed("jobs")
+    return result
+
+@router.get("/laws", response_model=Page[LawResponse])
+@versioned("laws")
+async def get_laws(
+    params: PageParams = Depends(),
+    code: Optional[str] = Query(None),
+    issuing_authority: Optional[str] = Query(None),
+    adopted_from: Optional[str] = Query(None),
+    adopted_to: Optional[str] = Query(None),
+    db: AsyncDB = Depends(get_db)
+):
+    conditions, args = [], []
+    if code:
+        condition, values = code_filter(code, "order_number")
+        conditions.append(condition)
+        args.extend(values)
+    if issuing_authority:
+        conditions.append("issuing_authority = ?")
+        args.append(issuing_authority)
+    if adopted_from:
+        conditions.append("adopted_date >= ?")
+        args.append(adopted_from)
+    if adopted_to:
+        conditions.append("adopted_date <= ?")
+        args.append(adopted_to)
+    page = await paginate(
+        db, "laws", params,
+        where=" AND ".join(conditions), args=tuple(args),
+        order_by=("adopted_date", "id"), descending=True
+    )
+    return json_page(page, LawResponse)
 
 @router.put("/laws/{id}", response_model=LawResponse)
 async def update_law(
@@ -72,18 +201,20 @@ async def update_law(
     issuing_authority: str = Form(...),
     link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM laws WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM laws WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Law not found")
-    link_path = await save_file(link, ["pdf"], "uploads/laws") if link else None
-    cursor.execute(
+    link_path = await save_file(db, link, ["pdf"], "uploads/laws") if link else None
+    await db.execute(
         "UPDATE laws SET name = ?, order_number = ?, adopted_date = ?, effective_date = ?, issuing_authority = ?, link = COALESCE(?, link) WHERE id = ?",
         (name, order_number, adopted_date, effective_date, issuing_authority, link_path, id)
     )
-    db.commit()
+    if link_path:
+        await release_file(db, item["link"])
+    await db.commit()
+    table_changed("laws")
     return {
         "id": id,
         "name": name,
@@ -95,54 +226,56 @@ async def update_law(
     }
 
 @router.delete("/laws/{id}")
-async def delete_law(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM laws WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_law(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM laws WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Law not found")
-    cursor.execute("DELETE FROM laws WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM laws WHERE id = ?", (id,))
+    await release_file(db, item["link"])
+    await db.commit()
+    table_changed("laws")
     return {"message": "Law deleted"}
 
 @router.post("/urban-norms", response_model=UrbanNormResponse)
 async def create_urban_norm(
     norm: UrbanNormCreate,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO urban_norms (norm_name) VALUES (?)", (norm.norm_name,))
-    db.commit()
+    cursor = await db.execute("INSERT INTO urban_norms (norm_name) VALUES (?)", (norm.norm_name,))
+    await db.commit()
+    table_changed("urban_norms")
     return {"id": cursor.lastrowid, "norm_name": norm.norm_name}
 
 @router.get("/urban-norms", response_model=List[UrbanNormResponse])
-async def get_urban_norms(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM urban_norms")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "norm_name": item["norm_name"]} for item in items]
+@cached("urban_norms")
+async def get_urban_norms(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, UrbanNormResponse, "urban_norms")
+
+@router.get("/urban-norms/tree", response_model=List[UrbanNormTree])
+@versioned(*NORM_TREE_TABLES)
+async def get_urban_norm_tree(db: AsyncDB = Depends(get_db)):
+    # Norma -> guruhlar -> hujjatlar bitta javobda: sahifa har bir norma va guruh uchun alohida so'rov yubormaydi
+    return JSONBytesResponse(await norm_tree.load(db))
 
 @router.post("/urban-norms/{norm_id}/groups", response_model=NormGroupResponse)
 async def create_norm_group(
     norm_id: int,
     group: NormGroupCreate,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM urban_norms WHERE id = ?", (norm_id,))
-    if not cursor.fetchone():
+    if not await db.fetchone("SELECT * FROM urban_norms WHERE id = ?", (norm_id,)):
         raise HTTPException(status_code=404, detail="Urban norm not found")
-    cursor.execute("INSERT INTO norm_groups (norm_id, group_name) VALUES (?, ?)", (norm_id, group.group_name))
-    db.commit()
+    cursor = await db.execute("INSERT INTO norm_groups (norm_id, group_name) VALUES (?, ?)", (norm_id, group.group_name))
+    await db.commit()
+    table_changed("norm_groups")
     return {"id": cursor.lastrowid, "norm_id": norm_id, "group_name": group.group_name}
 
 @router.get("/urban-norms/{norm_id}/groups", response_model=List[NormGroupResponse])
-async def get_norm_groups(norm_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM norm_groups WHERE norm_id = ?", (norm_id,))
-    items = cursor.fetchall()
-    return [{"id": item["id"], "norm_id": item["norm_id"], "group_name": item["group_name"]} for item in items]
+@versioned("norm_groups")
+async def get_norm_groups(norm_id: int, db: AsyncDB = Depends(get_db)):
+    return await json_list(db, NormGroupResponse, "norm_groups", where="norm_id = ?", args=(norm_id,))
 
 @router.post("/urban-norms/{norm_id}/groups/{group_id}/documents", response_model=NormDocumentResponse)
 async def create_norm_document(
@@ -152,38 +285,25 @@ async def create_norm_document(
     name: str = Form(...),
     link: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM urban_norms WHERE id = ?", (norm_id,))
-    if not cursor.fetchone():
+    if not await db.fetchone("SELECT * FROM urban_norms WHERE id = ?", (norm_id,)):
         raise HTTPException(status_code=404, detail="Urban norm not found")
-    cursor.execute("SELECT * FROM norm_groups WHERE id = ? AND norm_id = ?", (group_id, norm_id))
-    if not cursor.fetchone():
+    if not await db.fetchone("SELECT * FROM norm_groups WHERE id = ? AND norm_id = ?", (group_id, norm_id)):
         raise HTTPException(status_code=404, detail="Norm group not found")
-    link_path = await save_file(link, ["pdf"], "uploads/norm_documents")
-    cursor.execute(
+    link_path = await save_file(db, link, ["pdf"], "uploads/norm_documents")
+    cursor = await db.execute(
         "INSERT INTO norm_documents (norm_id, group_id, code, name, link) VALUES (?, ?, ?, ?, ?)",
         (norm_id, group_id, code, name, link_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("norm_documents")
     return {"id": cursor.lastrowid, "norm_id": norm_id, "group_id": group_id, "code": code, "name": name, "link": link_path}
 
 @router.get("/urban-norms/{norm_id}/groups/{group_id}/documents", response_model=List[NormDocumentResponse])
-async def get_norm_documents(norm_id: int, group_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM norm_documents WHERE norm_id = ? AND group_id = ?", (norm_id, group_id))
-    items = cursor.fetchall()
-    return [
-        {
-            "id": item["id"],
-            "norm_id": item["norm_id"],
-            "group_id": item["group_id"],
-            "code": item["code"],
-            "name": item["name"],
-            "link": item["link"]
-        } for item in items
-    ]
+@versioned("norm_documents")
+async def get_norm_documents(norm_id: int, group_id: int, db: AsyncDB = Depends(get_db)):
+    return await json_list(db, NormDocumentResponse, "norm_documents", where="norm_id = ? AND group_id = ?", args=(norm_id, group_id))
 
 @router.post("/standards", response_model=StandardResponse)
 async def create_standard(
@@ -191,23 +311,22 @@ async def create_standard(
     name: str = Form(...),
     pdf_link: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/standards")
-    cursor = db.cursor()
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/standards")
+    cursor = await db.execute(
         "INSERT INTO standards (code, name, pdf_link) VALUES (?, ?, ?)",
         (code, name, pdf_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("standards")
     return {"id": cursor.lastrowid, "code": code, "name": name, "pdf_link": pdf_path}
 
-@router.get("/standards", response_model=List[StandardResponse])
-async def get_standards(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM standards")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "code": item["code"], "name": item["name"], "pdf_link": item["pdf_link"]} for item in items]
+@router.get("/standards", response_model=Page[StandardResponse])
+@versioned("standards")
+async def get_standards(params: PageParams = Depends(), code: Optional[str] = Query(None), db: AsyncDB = Depends(get_db)):
+    where, args = code_filter(code)
+    return json_page(await paginate(db, "standards", params, where=where, args=args, order_by=("code", "id")), StandardResponse)
 
 @router.put("/standards/{id}", response_model=StandardResponse)
 async def update_standard(
@@ -216,28 +335,31 @@ async def update_standard(
     name: str = Form(...),
     pdf_link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM standards WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM standards WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Standard not found")
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/standards") if pdf_link else None
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/standards") if pdf_link else None
+    await db.execute(
         "UPDATE standards SET code = ?, name = ?, pdf_link = COALESCE(?, pdf_link) WHERE id = ?",
         (code, name, pdf_path, id)
     )
-    db.commit()
+    if pdf_path:
+        await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("standards")
     return {"id": id, "code": code, "name": name, "pdf_link": pdf_path}
 
 @router.delete("/standards/{id}")
-async def delete_standard(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM standards WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_standard(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM standards WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Standard not found")
-    cursor.execute("DELETE FROM standards WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM standards WHERE id = ?", (id,))
+    await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("standards")
     return {"message": "Standard deleted"}
 
 @router.post("/regulations", response_model=RegulationResponse)
@@ -246,23 +368,22 @@ async def create_regulation(
     name: str = Form(...),
     pdf_link: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/regulations")
-    cursor = db.cursor()
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/regulations")
+    cursor = await db.execute(
         "INSERT INTO regulations (code, name, pdf_link) VALUES (?, ?, ?)",
         (code, name, pdf_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("regulations")
     return {"id": cursor.lastrowid, "code": code, "name": name, "pdf_link": pdf_path}
 
-@router.get("/regulations", response_model=List[RegulationResponse])
-async def get_regulations(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM regulations")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "code": item["code"], "name": item["name"], "pdf_link": item["pdf_link"]} for item in items]
+@router.get("/regulations", response_model=Page[RegulationResponse])
+@versioned("regulations")
+async def get_regulations(params: PageParams = Depends(), code: Optional[str] = Query(None), db: AsyncDB = Depends(get_db)):
+    where, args = code_filter(code)
+    return json_page(await paginate(db, "regulations", params, where=where, args=args, order_by=("code", "id")), RegulationResponse)
 
 @router.put("/regulations/{id}", response_model=RegulationResponse)
 async def update_regulation(
@@ -271,28 +392,31 @@ async def update_regulation(
     name: str = Form(...),
     pdf_link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM regulations WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM regulations WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Regulation not found")
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/regulations") if pdf_link else None
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/regulations") if pdf_link else None
+    await db.execute(
         "UPDATE regulations SET code = ?, name = ?, pdf_link = COALESCE(?, pdf_link) WHERE id = ?",
         (code, name, pdf_path, id)
     )
-    db.commit()
+    if pdf_path:
+        await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("regulations")
     return {"id": id, "code": code, "name": name, "pdf_link": pdf_path}
 
 @router.delete("/regulations/{id}")
-async def delete_regulation(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM regulations WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_regulation(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM regulations WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Regulation not found")
-    cursor.execute("DELETE FROM regulations WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM regulations WHERE id = ?", (id,))
+    await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("regulations")
     return {"message": "Regulation deleted"}
 
 @router.post("/resource-norms", response_model=ResourceNormResponse)
@@ -301,23 +425,22 @@ async def create_resource_norm(
     name: str = Form(...),
     pdf_link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/resource_norms") if pdf_link else None
-    cursor = db.cursor()
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/resource_norms") if pdf_link else None
+    cursor = await db.execute(
         "INSERT INTO resource_norms (code, name, pdf_link) VALUES (?, ?, ?)",
         (code, name, pdf_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("resource_norms")
     return {"id": cursor.lastrowid, "code": code, "name": name, "pdf_link": pdf_path}
 
-@router.get("/resource-norms", response_model=List[ResourceNormResponse])
-async def get_resource_norms(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM resource_norms")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "code": item["code"], "name": item["name"], "pdf_link": item["pdf_link"]} for item in items]
+@router.get("/resource-norms", response_model=Page[ResourceNormResponse])
+@versioned("resource_norms")
+async def get_resource_norms(params: PageParams = Depends(), code: Optional[str] = Query(None), db: AsyncDB = Depends(get_db)):
+    where, args = code_filter(code)
+    return json_page(await paginate(db, "resource_norms", params, where=where, args=args, order_by=("code", "id")), ResourceNormResponse)
 
 @router.put("/resource-norms/{id}", response_model=ResourceNormResponse)
 async def update_resource_norm(
@@ -326,28 +449,31 @@ async def update_resource_norm(
     name: str = Form(...),
     pdf_link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM resource_norms WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM resource_norms WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Resource norm not found")
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/resource_norms") if pdf_link else None
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/resource_norms") if pdf_link else None
+    await db.execute(
         "UPDATE resource_norms SET code = ?, name = ?, pdf_link = COALESCE(?, pdf_link) WHERE id = ?",
         (code, name, pdf_path, id)
     )
-    db.commit()
+    if pdf_path:
+        await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("resource_norms")
     return {"id": id, "code": code, "name": name, "pdf_link": pdf_path}
 
 @router.delete("/resource-norms/{id}")
-async def delete_resource_norm(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM resource_norms WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_resource_norm(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM resource_norms WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Resource norm not found")
-    cursor.execute("DELETE FROM resource_norms WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM resource_norms WHERE id = ?", (id,))
+    await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("resource_norms")
     return {"message": "Resource norm deleted"}
 
 @router.post("/reference-docs", response_model=ReferenceDocResponse)
@@ -355,23 +481,21 @@ async def create_reference_doc(
     name: str = Form(...),
     pdf_link: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/reference_docs")
-    cursor = db.cursor()
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/reference_docs")
+    cursor = await db.execute(
         "INSERT INTO reference_docs (name, pdf_link) VALUES (?, ?)",
         (name, pdf_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("reference_docs")
     return {"id": cursor.lastrowid, "name": name, "pdf_link": pdf_path}
 
-@router.get("/reference-docs", response_model=List[ReferenceDocResponse])
-async def get_reference_docs(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM reference_docs")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "name": item["name"], "pdf_link": item["pdf_link"]} for item in items]
+@router.get("/reference-docs", response_model=Page[ReferenceDocResponse])
+@versioned("reference_docs")
+async def get_reference_docs(params: PageParams = Depends(), db: AsyncDB = Depends(get_db)):
+    return json_page(await paginate(db, "reference_docs", params), ReferenceDocResponse)
 
 @router.put("/reference-docs/{id}", response_model=ReferenceDocResponse)
 async def update_reference_doc(
@@ -379,26 +503,29 @@ async def update_reference_doc(
     name: str = Form(...),
     pdf_link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM reference_docs WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM reference_docs WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Reference doc not found")
-    pdf_path = await save_file(pdf_link, ["pdf"], "uploads/reference_docs") if pdf_link else None
-    cursor.execute(
+    pdf_path = await save_file(db, pdf_link, ["pdf"], "uploads/reference_docs") if pdf_link else None
+    await db.execute(
         "UPDATE reference_docs SET name = ?, pdf_link = COALESCE(?, pdf_link) WHERE id = ?",
         (name, pdf_path, id)
     )
-    db.commit()
+    if pdf_path:
+        await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("reference_docs")
     return {"id": id, "name": name, "pdf_link": pdf_path}
 
 @router.delete("/reference-docs/{id}")
-async def delete_reference_doc(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM reference_docs WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_reference_doc(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM reference_docs WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Reference doc not found")
-    cursor.execute("DELETE FROM reference_docs WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM reference_docs WHERE id = ?", (id,))
+    await release_file(db, item["pdf_link"])
+    await db.commit()
+    table_changed("reference_docs")
     return {"message": "Reference doc deleted"}
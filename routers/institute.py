@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
 from typing import List
 from schemas.institute import (
-    InstituteInfoCreate, InstituteInfoResponse,
-    ManagementCreate, ManagementResponse,
-    StructureCreate, StructureResponse,
-    DepartmentCreate, DepartmentResponse,
+    InstituteInfoResponse,
+    ManagementResponse,
+    StructureResponse,
+    DepartmentResponse,
     VacancyCreate, VacancyResponse
 )
 from dependencies import get_db, get_current_admin
-from fastapi_pagination import Page, paginate
-from utils.file_upload import save_file
-import sqlite3
+from utils.file_upload import save_file, release_file
+from utils.images import SRCSET_COLUMNS
+from utils.async_db import AsyncDB
+from utils.db_events import table_changed
+from utils.response_cache import CachedRoute, cached
+from utils.fast_json import json_list
+from utils.http_cache import versioned
 
-router = APIRouter(prefix="/institute", tags=["institute"])
+router = APIRouter(prefix="/institute", tags=["institute"], route_class=CachedRoute)
 
 @router.post("/about", response_model=InstituteInfoResponse)
 async def create_institute_info(
@@ -20,24 +24,22 @@ async def create_institute_info(
     charter_pdf: UploadFile = File(None),
     statute_pdf: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    charter_path = await save_file(charter_pdf, ["pdf"], "uploads/institute") if charter_pdf else None
-    statute_path = await save_file(statute_pdf, ["pdf"], "uploads/institute") if statute_pdf else None
-    cursor = db.cursor()
-    cursor.execute(
+    charter_path = await save_file(db, charter_pdf, ["pdf"], "uploads/institute") if charter_pdf else None
+    statute_path = await save_file(db, statute_pdf, ["pdf"], "uploads/institute") if statute_pdf else None
+    cursor = await db.execute(
         "INSERT INTO institute_info (content, charter_pdf, statute_pdf) VALUES (?, ?, ?)",
         (content, charter_path, statute_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("institute_info")
     return {"id": cursor.lastrowid, "content": content, "charter_pdf": charter_path, "statute_pdf": statute_path}
 
 @router.get("/about", response_model=List[InstituteInfoResponse])
-async def get_institute_info(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM institute_info")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "content": item["content"], "charter_pdf": item["charter_pdf"], "statute_pdf": item["statute_pdf"]} for item in items]
+@versioned("institute_info")
+async def get_institute_info(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, InstituteInfoResponse, "institute_info")
 
 @router.put("/about/{id}", response_model=InstituteInfoResponse)
 async def update_institute_info(
@@ -46,29 +48,34 @@ async def update_institute_info(
     charter_pdf: UploadFile = File(None),
     statute_pdf: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM institute_info WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM institute_info WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Institute info not found")
-    charter_path = await save_file(charter_pdf, ["pdf"], "uploads/institute") if charter_pdf else None
-    statute_path = await save_file(statute_pdf, ["pdf"], "uploads/institute") if statute_pdf else None
-    cursor.execute(
+    charter_path = await save_file(db, charter_pdf, ["pdf"], "uploads/institute") if charter_pdf else None
+    statute_path = await save_file(db, statute_pdf, ["pdf"], "uploads/institute") if statute_pdf else None
+    await db.execute(
         "UPDATE institute_info SET content = ?, charter_pdf = COALESCE(?, charter_pdf), statute_pdf = COALESCE(?, statute_pdf) WHERE id = ?",
         (content, charter_path, statute_path, id)
     )
-    db.commit()
+    if charter_path:
+        await release_file(db, item["charter_pdf"])
+    if statute_path:
+        await release_file(db, item["statute_pdf"])
+    await db.commit()
+    table_changed("institute_info")
     return {"id": id, "content": content, "charter_pdf": charter_path, "statute_pdf": statute_path}
 
 @router.delete("/about/{id}")
-async def delete_institute_info(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM institute_info WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_institute_info(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM institute_info WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Institute info not found")
-    cursor.execute("DELETE FROM institute_info WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM institute_info WHERE id = ?", (id,))
+    await release_file(db, item["charter_pdf"], item["statute_pdf"])
+    await db.commit()
+    table_changed("institute_info")
     return {"message": "Institute info deleted"}
 
 @router.post("/management", response_model=ManagementResponse)
@@ -80,23 +87,21 @@ async def create_management(
     email: str = Form(None),
     specialty: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    image_path = await save_file(image, ["jpg", "png"], "uploads/management") if image else None
-    cursor = db.cursor()
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/management") if image else None
+    cursor = await db.execute(
         "INSERT INTO management (image, position, full_name, phone, email, specialty) VALUES (?, ?, ?, ?, ?, ?)",
         (image_path, position, full_name, phone, email, specialty)
     )
-    db.commit()
+    await db.commit()
+    table_changed("management")
     return {"id": cursor.lastrowid, "image": image_path, "position": position, "full_name": full_name, "phone": phone, "email": email, "specialty": specialty}
 
 @router.get("/management", response_model=List[ManagementResponse])
-async def get_management(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM management")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "image": item["image"], "position": item["position"], "full_name": item["full_name"], "phone": item["phone"], "email": item["email"], "specialty": item["specialty"]} for item in items]
+@cached("management", "image_variants")
+async def get_management(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, ManagementResponse, "management", computed=SRCSET_COLUMNS)
 
 @router.put("/management/{id}", response_model=ManagementResponse)
 async def update_management(
@@ -108,73 +113,76 @@ async def update_management(
     email: str = Form(None),
     specialty: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM management WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM management WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Management not found")
-    image_path = await save_file(image, ["jpg", "png"], "uploads/management") if image else None
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/management") if image else None
+    await db.execute(
         "UPDATE management SET image = COALESCE(?, image), position = ?, full_name = ?, phone = ?, email = ?, specialty = ? WHERE id = ?",
         (image_path, position, full_name, phone, email, specialty, id)
     )
-    db.commit()
+    if image_path:
+        await release_file(db, item["image"])
+    await db.commit()
+    table_changed("management")
     return {"id": id, "image": image_path, "position": position, "full_name": full_name, "phone": phone, "email": email, "specialty": specialty}
 
 @router.delete("/management/{id}")
-async def delete_management(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM management WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_management(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM management WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Management not found")
-    cursor.execute("DELETE FROM management WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM management WHERE id = ?", (id,))
+    await release_file(db, item["image"])
+    await db.commit()
+    table_changed("management")
     return {"message": "Management deleted"}
 
 @router.post("/structure", response_model=StructureResponse)
 async def create_structure(
     image: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    image_path = await save_file(image, ["jpg", "png"], "uploads/structure")
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO structure (image) VALUES (?)", (image_path,))
-    db.commit()
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/structure")
+    cursor = await db.execute("INSERT INTO structure (image) VALUES (?)", (image_path,))
+    await db.commit()
+    table_changed("structure")
     return {"id": cursor.lastrowid, "image": image_path}
 
 @router.get("/structure", response_model=List[StructureResponse])
-async def get_structure(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM structure")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "image": item["image"]} for item in items]
+@cached("structure", "image_variants")
+async def get_structure(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, StructureResponse, "structure", computed=SRCSET_COLUMNS)
 
 @router.put("/structure/{id}", response_model=StructureResponse)
 async def update_structure(
     id: int,
     image: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM structure WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM structure WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Structure not found")
-    image_path = await save_file(image, ["jpg", "png"], "uploads/structure")
-    cursor.execute("UPDATE structure SET image = ? WHERE id = ?", (image_path, id))
-    db.commit()
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/structure")
+    await db.execute("UPDATE structure SET image = ? WHERE id = ?", (image_path, id))
+    await release_file(db, item["image"])
+    await db.commit()
+    table_changed("structure")
     return {"id": id, "image": image_path}
 
 @router.delete("/structure/{id}")
-async def delete_structure(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM structure WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_structure(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM structure WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Structure not found")
-    cursor.execute("DELETE FROM structure WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM structure WHERE id = ?", (id,))
+    await release_file(db, item["image"])
+    await db.commit()
+    table_changed("structure")
     return {"message": "Structure deleted"}
 
 @router.post("/departments", response_model=DepartmentResponse)
@@ -185,23 +193,21 @@ async def create_department(
     head_phone: str = Form(None),
     head_email: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    image_path = await save_file(image, ["jpg", "png"], "uploads/departments") if image else None
-    cursor = db.cursor()
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/departments") if image else None
+    cursor = await db.execute(
         "INSERT INTO departments (image, name, head, head_phone, head_email) VALUES (?, ?, ?, ?, ?)",
         (image_path, name, head, head_phone, head_email)
     )
-    db.commit()
+    await db.commit()
+    table_changed("departments")
     return {"id": cursor.lastrowid, "image": image_path, "name": name, "head": head, "head_phone": head_phone, "head_email": head_email}
 
 @router.get("/departments", response_model=List[DepartmentResponse])
-async def get_departments(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM departments")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "image": item["image"], "name": item["name"], "head": item["head"], "head_phone": item["head_phone"], "head_email": item["head_email"]} for item in items]
+@cached("departments", "image_variants")
+async def get_departments(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, DepartmentResponse, "departments", computed=SRCSET_COLUMNS)
 
 @router.put("/departments/{id}", response_model=DepartmentResponse)
 async def update_department(
@@ -212,49 +218,51 @@ async def update_department(
     head_phone: str = Form(None),
     head_email: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM departments WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM departments WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Department not found")
-    image_path = await save_file(image, ["jpg", "png"], "uploads/departments") if image else None
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/departments") if image else None
+    await db.execute(
         "UPDATE departments SET image = COALESCE(?, image), name = ?, head = ?, head_phone = ?, head_email = ? WHERE id = ?",
         (image_path, name, head, head_phone, head_email, id)
     )
-    db.commit()
+    if image_path:
+        await release_file(db, item["image"])
+    await db.commit()
+    table_changed("departments")
     return {"id": id, "image": image_path, "name": name, "head": head, "head_phone": head_phone, "head_email": head_email}
 
 @router.delete("/departments/{id}")
-async def delete_department(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM departments WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_department(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone("SELECT * FROM departments WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Department not found")
-    cursor.execute("DELETE FROM departments WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM departments WHERE id = ?", (id,))
+    await release_file(db, item["image"])
+    await db.commit()
+    table_changed("departments")
     return {"message": "Department deleted"}
 
 @router.post("/vacancies", response_model=VacancyResponse)
 async def create_vacancy(
     vacancy: VacancyCreate,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute(
+    cursor = await db.execute(
         "INSERT INTO vacancies (title, position, department, requirements, status) VALUES (?, ?, ?, ?, ?)",
         (vacancy.title, vacancy.position, vacancy.department, vacancy.requirements, vacancy.status)
     )
-    db.commit()
+    await db.commit()
+    table_changed("vacancies")
     return {**vacancy.dict(), "id": cursor.lastrowid}
 
 @router.get("/vacancies", response_model=List[VacancyResponse])
-async def get_vacancies(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM vacancies")
-    items = cursor.fetchall()
+@versioned("vacancies")
+async def get_vacancies(db: AsyncDB = Depends(get_db)):
+    items = await db.fetchall("SELECT * FROM vacancies")
     return [{"id": item["id"], "title": item["title"], "position": item["position"], "department": item["department"], "requirements": item["requirements"], "status": item["status"]} for item in items]
 
 @router.put("/vacancies/{id}", response_model=VacancyResponse)
@@ -262,25 +270,23 @@ async def update_vacancy(
     id: int,
     vacancy: VacancyCreate,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM vacancies WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    if not await db.fetchone("SELECT * FROM vacancies WHERE id = ?", (id,)):
         raise HTTPException(status_code=404, detail="Vacancy not found")
-    cursor.execute(
+    await db.execute(
         "UPDATE vacancies SET title = ?, position = ?, department = ?, requirements = ?, status = ? WHERE id = ?",
         (vacancy.title, vacancy.position, vacancy.department, vacancy.requirements, vacancy.status, id)
     )
-    db.commit()
+    await db.commit()
+    table_changed("vacancies")
     return {**vacancy.dict(), "id": id}
 
 @router.delete("/vacancies/{id}")
-async def delete_vacancy(id: int, current_user: dict = Depends(get_current_admin), db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM vacancies WHERE id = ?", (id,))
-    if not cursor.fetchone():
+async def delete_vacancy(id: int, current_user: dict = Depends(get_current_admin), db: AsyncDB = Depends(get_db)):
+    if not await db.fetchone("SELECT * FROM vacancies WHERE id = ?", (id,)):
         raise HTTPException(status_code=404, detail="Vacancy not found")
-    cursor.execute("DELETE FROM vacancies WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM vacancies WHERE id = ?", (id,))
+    await db.commit()
+    table_changed("vacancies")
     return {"message": "Vacancy deleted"}
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
 from typing import List
-import sqlite3
+from utils.async_db import AsyncDB
 from dependencies import get_db, get_current_admin
 from schemas.news import (
-    AnnouncementCreate, AnnouncementResponse,
-    NewsCreate, NewsResponse,
-    AnticorruptionCreate, AnticorruptionResponse
+    AnnouncementResponse,
+    NewsResponse,
+    AnticorruptionResponse
 )
-from fastapi_pagination import Page, paginate
-from utils.file_upload import save_file
+from schemas.pagination import Page
+from utils.pagination import PageParams, paginate
+from utils.db_events import table_changed
+from utils.response_cache import CachedRoute, cached
+from utils.fast_json import json_list, json_page, select_columns
+from utils.http_cache import versioned
+from utils.file_upload import save_file, release_file
+from utils.images import SRCSET_COLUMNS
 
-router = APIRouter(prefix="/news", tags=["news"])
+router = APIRouter(prefix="/news", tags=["news"], route_class=CachedRoute)
 
 # E'LONLAR
 @router.post("/announcements", response_model=AnnouncementResponse)
@@ -21,23 +27,21 @@ async def create_announcement(
     image: UploadFile = File(None),
     link: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    image_path = await save_file(image, ["jpg", "png"], "uploads/announcements") if image else None
-    cursor = db.cursor()
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/announcements") if image else None
+    cursor = await db.execute(
         "INSERT INTO announcements (title, content, date, image, link) VALUES (?, ?, ?, ?, ?)",
         (title, content, date, image_path, link)
     )
-    db.commit()
+    await db.commit()
+    table_changed("announcements")
     return {"id": cursor.lastrowid, "title": title, "content": content, "date": date, "image": image_path, "link": link}
 
 @router.get("/announcements", response_model=List[AnnouncementResponse])
-async def get_announcements(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM announcements")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "title": item["title"], "content": item["content"], "date": item["date"], "link": item["link"]} for item in items]
+@versioned("announcements", "image_variants")
+async def get_announcements(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, AnnouncementResponse, "announcements", computed=SRCSET_COLUMNS)
 
 @router.put("/announcements/{id}", response_model=AnnouncementResponse)
 async def update_announcement(
@@ -47,31 +51,31 @@ async def update_announcement(
     date: str = Form(...),
     link: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM announcements WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    if not await db.fetchone("SELECT * FROM announcements WHERE id = ?", (id,)):
         raise HTTPException(status_code=404, detail="Announcement not found")
-    cursor.execute(
+    await db.execute(
         "UPDATE announcements SET title = ?, content = ?, date = ?, link = ? WHERE id = ?",
         (title, content, date, link, id)
     )
-    db.commit()
+    await db.commit()
+    table_changed("announcements")
     return {"id": id, "title": title, "content": content, "date": date, "link": link}
 
 @router.delete("/announcements/{id}")
 async def delete_announcement(
     id: int,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM announcements WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM announcements WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Announcement not found")
-    cursor.execute("DELETE FROM announcements WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM announcements WHERE id = ?", (id,))
+    await release_file(db, item["image"])
+    await db.commit()
+    table_changed("announcements")
     return {"message": "Announcement deleted"}
 
 # YANGILIK
@@ -82,23 +86,22 @@ async def create_news(
     date: str = Form(...),
     image: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    image_path = await save_file(image, ["jpg", "png"], "uploads/news") if image else None
-    cursor = db.cursor()
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/news") if image else None
+    cursor = await db.execute(
         "INSERT INTO news (title, content, date, image) VALUES (?, ?, ?, ?)",
         (title, content, date, image_path)
     )
-    db.commit()
+    await db.commit()
+    table_changed("news")
     return {"id": cursor.lastrowid, "title": title, "content": content, "date": date, "image": image_path}
 
 @router.get("/news", response_model=Page[NewsResponse])
-async def get_news(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM news")
-    items = cursor.fetchall()
-    return paginate([{"id": item["id"], "title": item["title"], "content": item["content"], "date": item["date"], "image": item["image"]} for item in items])
+@versioned("news", "image_variants")
+async def get_news(params: PageParams = Depends(), db: AsyncDB = Depends(get_db)):
+    columns = select_columns(NewsResponse, SRCSET_COLUMNS)
+    return json_page(await paginate(db, "news", params, columns=columns, order_by=("date", "id"), descending=True), NewsResponse)
 
 @router.put("/news/{id}", response_model=NewsResponse)
 async def update_news(
@@ -108,49 +111,49 @@ async def update_news(
     date: str = Form(...),
     image: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM news WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM news WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="News not found")
-    image_path = await save_file(image, ["jpg", "png"], "uploads/news") if image else None
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/news") if image else None
+    await db.execute(
         "UPDATE news SET title = ?, content = ?, date = ?, image = COALESCE(?, image) WHERE id = ?",
         (title, content, date, image_path, id)
     )
-    db.commit()
+    if image_path:
+        await release_file(db, item["image"])
+    await db.commit()
+    table_changed("news")
     return {"id": id, "title": title, "content": content, "date": date, "image": image_path}
 
 @router.delete("/news/{id}")
 async def delete_news(
     id: int,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM news WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM news WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="News not found")
-    cursor.execute("DELETE FROM news WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM news WHERE id = ?", (id,))
+    await release_file(db, item["image"])
+    await db.commit()
+    table_changed("news")
     return {"message": "News deleted"}
 
 @router.get("/news/{id}", response_model=NewsResponse)
-async def get_news_detail(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM news WHERE id = ?", (id,))
-    item = cursor.fetchone()
+@versioned("news", "image_variants")
+async def get_news_detail(id: int, db: AsyncDB = Depends(get_db)):
+    item = await db.fetchone(f"SELECT {select_columns(NewsResponse, SRCSET_COLUMNS)} FROM news WHERE id = ?", (id,))
     if not item:
         raise HTTPException(status_code=404, detail="News not found")
-    return {"id": item["id"], "title": item["title"], "content": item["content"], "date": item["date"], "image": item["image"]}
+    return dict(item)
 
 @router.get("/related-news", response_model=List[NewsResponse])
-async def get_related_news(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM news ORDER BY date DESC LIMIT 5")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "title": item["title"], "content": item["content"], "date": item["date"], "image": item["image"]} for item in items]
+@cached("news", "image_variants")
+async def get_related_news(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, NewsResponse, "news", order_by="date DESC", limit=5, computed=SRCSET_COLUMNS)
 
 # KORRUPSIYAGA QARSHI KURASHISH
 @router.post("/anticorruption", response_model=AnticorruptionResponse)
@@ -163,16 +166,16 @@ async def create_anticorruption(
     document_link: UploadFile = File(None),
     telegram_link: str = Form(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    image_path = await save_file(image, ["jpg", "png"], "uploads/anticorruption") if image else None
-    doc_path = await save_file(document_link, ["pdf"], "uploads/anticorruption") if document_link else None
-    cursor = db.cursor()
-    cursor.execute(
+    image_path = await save_file(db, image, ["jpg", "png"], "uploads/anticorruption") if image else None
+    doc_path = await save_file(db, document_link, ["pdf"], "uploads/anticorruption") if document_link else None
+    cursor = await db.execute(
         "INSERT INTO anticorruption (title, content, minister_message, date, image, document_link, telegram_link) VALUES (?, ?, ?, ?, ?, ?, ?)",
         (title, content, minister_message, date, image_path, doc_path, telegram_link)
     )
-    db.commit()
+    await db.commit()
+    table_changed("anticorruption")
     return {
         "id": cursor.lastrowid,
         "title": title,
@@ -185,11 +188,9 @@ async def create_anticorruption(
     }
 
 @router.get("/anticorruption", response_model=List[AnticorruptionResponse])
-async def get_anticorruption(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM anticorruption")
-    items = cursor.fetchall()
-    return [{"id": item["id"], "title": item["title"], "content": item["content"], "date": item["date"], "document_link": item["document_link"]} for item in items]
+@versioned("anticorruption", "image_variants")
+async def get_anticorruption(db: AsyncDB = Depends(get_db)):
+    return await json_list(db, AnticorruptionResponse, "anticorruption", computed=SRCSET_COLUMNS)
 
 @router.put("/anticorruption/{id}", response_model=AnticorruptionResponse)
 async def update_anticorruption(
@@ -199,30 +200,33 @@ async def update_anticorruption(
     date: str = Form(...),
     document_link: UploadFile = File(None),
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM anticorruption WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM anticorruption WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Anticorruption not found")
-    doc_path = await save_file(document_link, ["pdf"], "uploads/anticorruption") if document_link else None
-    cursor.execute(
+    doc_path = await save_file(db, document_link, ["pdf"], "uploads/anticorruption") if document_link else None
+    await db.execute(
         "UPDATE anticorruption SET title = ?, content = ?, date = ?, document_link = COALESCE(?, document_link) WHERE id = ?",
         (title, content, date, doc_path, id)
     )
-    db.commit()
+    if doc_path:
+        await release_file(db, item["document_link"])
+    await db.commit()
+    table_changed("anticorruption")
     return {"id": id, "title": title, "content": content, "date": date, "document_link": doc_path}
 
 @router.delete("/anticorruption/{id}")
 async def delete_anticorruption(
     id: int,
     current_user: dict = Depends(get_current_admin),
-    db: sqlite3.Connection = Depends(get_db)
+    db: AsyncDB = Depends(get_db)
 ):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM anticorruption WHERE id = ?", (id,))
-    if not cursor.fetchone():
+    item = await db.fetchone("SELECT * FROM anticorruption WHERE id = ?", (id,))
+    if not item:
         raise HTTPException(status_code=404, detail="Anticorruption not found")
-    cursor.execute("DELETE FROM anticorruption WHERE id = ?", (id,))
-    db.commit()
+    await db.execute("DELETE FROM anticorruption WHERE id = ?", (id,))
+    await release_file(db, item["image"], item["document_link"])
+    await db.commit()
+    table_changed("anticorruption")
     return {"message": "Anticorruption deleted"}
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from email.utils import formatdate
+import asyncio
+import os
+import re
+import stat
+from utils.http_cache import not_modified
+
+router = APIRouter(tags=["uploads"])
+
+UPLOAD_ROOT = os.path.realpath("uploads")
+# Murojaatlarga biriktirilgan fayllar ochiq tarqatilmaydi
+PRIVATE_CATEGORIES = {"contact"}
+
+# Kontent-manzilli nom (utils.file_upload): ab/cd/<sha256>.<kengaytma> - hech qachon o'zgarmaydi.
+# Rasm nusxalari (utils.images): ab/cd/<sha256>.<kengaytma>.w<kenglik>.<format>
+OBJECT_NAME_RE = re.compile(r"(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+(\.w\d+\.\w+)?$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _stat(path: str):
+    try:
+        result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return result if stat.S_ISREG(result.st_mode) else None
+
+
+@router.api_route("/uploads/{path:path}", methods=["GET", "HEAD"])
+async def serve_upload(path: str, request: Request):
+    full_path = os.path.realpath(os.path.join(UPLOAD_ROOT, path))
+    relative = os.path.relpath(full_path, UPLOAD_ROOT)
+    parts = relative.split(os.sep)
+    if relative.startswith("..") or parts[0] in PRIVATE_CATEGORIES or any(part.startswith(".") for part in parts):
+        raise HTTPException(status_code=404, detail="File not found")
+    stat_result = await asyncio.get_running_loop().run_in_executor(None, _stat, full_path)
+    if stat_result is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    match = OBJECT_NAME_RE.search(relative.replace(os.sep, "/"))
+    if match:
+        # Xesh - kuchli ETag, fayl mazmuni bilan bir xil (nusxada - xesh va nusxa o'lchami/formati)
+        etag = f'"{match.group(1)}{match.group(2) or ""}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        cache_control = DEFAULT_CACHE_CONTROL
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+    if not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    # FileResponse Range so'rovlarini qo'llab-quvvatlaydi, server imkon bersa pathsend (sendfile) ishlatadi
+    return FileResponse(full_path, headers=headers, stat_result=stat_result)
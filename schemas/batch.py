@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional, Union
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    resource: str
+    id: Optional[int] = None
+    data: Dict[str, Union[str, int, float, None]] = {}
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=500)
+    # True - bitta xato butun paketni bekor qiladi; False - faqat xato amal bekor qilinadi
+    atomic: bool = True
+
+class BatchOperationResult(BaseModel):
+    index: int
+    status: Literal["ok", "error", "rolled_back", "skipped"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchOperationResult]
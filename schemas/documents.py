@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from fastapi import Form, File, UploadFile
 
 class LawCreate(BaseModel):
@@ -64,6 +64,23 @@ class NormDocumentResponse(NormDocumentCreate):
     norm_id: int
     group_id: int
 
+# Normalar daraxti: /documents/urban-norms/tree
+class NormTreeDocument(BaseModel):
+    id: int
+    code: str
+    name: str
+    link: Optional[str] = None
+
+class NormTreeGroup(BaseModel):
+    id: int
+    group_name: str
+    documents: List[NormTreeDocument]
+
+class UrbanNormTree(BaseModel):
+    id: int
+    norm_name: str
+    groups: List[NormTreeGroup]
+
 class StandardCreate(BaseModel):
     code: str
     name: str
@@ -129,4 +146,57 @@ class ReferenceDocCreate(BaseModel):
 
 class ReferenceDocResponse(ReferenceDocCreate):
     id: int
-    
\ No newline at end of file
+
+class DocumentSearchResult(BaseModel):
+    source: str
+    id: int
+    code: Optional[str] = None
+    name: str
+    issuing_authority: Optional[str] = None
+    link: Optional[str] = None
+    snippet: Optional[str] = None
+
+# Ommaviy import (CSV / NDJSON) qatorlari: fayllar keyinroq biriktiriladi, shuning uchun havolalar ixtiyoriy
+class LawImport(BaseModel):
+    name: str
+    order_number: str
+    adopted_date: str
+    effective_date: str
+    issuing_authority: str
+    link: Optional[str] = None
+
+class NormDocumentImport(BaseModel):
+    norm_id: int
+    group_id: int
+    code: str
+    name: str
+    link: Optional[str] = None
+
+class CodedDocumentImport(BaseModel):
+    code: str
+    name: str
+    pdf_link: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    source: str
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+    seconds: float
+
+class AttachFileError(BaseModel):
+    file: str
+    error: str
+
+class AttachResult(BaseModel):
+    source: str
+    files: int
+    attached: int
+    replaced: int
+    unmatched: List[str]
+    errors: List[AttachFileError]
+    seconds: float
@@ -41,6 +41,9 @@ class ManagementCreate(BaseModel):
 
 class ManagementResponse(ManagementCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
 
 class StructureCreate(BaseModel):
     image: str
@@ -51,6 +54,9 @@ class StructureCreate(BaseModel):
 
 class StructureResponse(StructureCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
 
 class DepartmentCreate(BaseModel):
     image: Optional[str] = None
@@ -72,6 +78,9 @@ class DepartmentCreate(BaseModel):
 
 class DepartmentResponse(DepartmentCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
 
 class VacancyCreate(BaseModel):
     title: str
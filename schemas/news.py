@@ -22,9 +22,15 @@ class AnnouncementCreate(BaseModel):
 
 class AnnouncementResponse(AnnouncementCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
 
 class AnnouncementResponse(AnnouncementCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
 
 class NewsCreate(BaseModel):
     title: str
@@ -44,6 +50,9 @@ class NewsCreate(BaseModel):
 
 class NewsResponse(NewsCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
 
 class AnticorruptionCreate(BaseModel):
     title: str
@@ -77,3 +86,6 @@ class AnticorruptionCreate(BaseModel):
 
 class AnticorruptionResponse(AnticorruptionCreate):
     id: int
+    # Kichraytirilgan nusxalar (utils.images); tayyor bo'lmaguncha None
+    srcset: Optional[str] = None
+    srcset_jpeg: Optional[str] = None
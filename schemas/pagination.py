@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    total: int
+    page: Optional[int] = None
+    size: int
+    pages: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,22 @@
+import sqlite3
+from utils.migrations import MIGRATIONS, check_query_plans, current_version, migrate
+
+
+def test_fresh_database_uses_indexes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "fresh.db")
+    try:
+        migrate(conn)
+        assert current_version(conn) == MIGRATIONS[-1][0]
+        assert check_query_plans(conn) == []
+    finally:
+        conn.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    conn = sqlite3.connect(tmp_path / "again.db")
+    try:
+        migrate(conn)
+        assert migrate(conn) == []
+        assert check_query_plans(conn) == []
+    finally:
+        conn.close()
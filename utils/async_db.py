@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class AsyncDB:
+    # sqlite3 chaqiruvlari alohida oqimlar havzasida bajariladi, event loop bloklanmaydi
+    def __init__(self, conn, executor: ThreadPoolExecutor):
+        self.conn = conn
+        self.executor = executor
+        # Tranzaksiya natijasiga bog'liq ishlar: after_commit - event loop'da, after_rollback - oqimda (fn(conn))
+        self._after_commit = []
+        self._after_rollback = []
+
+    def after_commit(self, fn):
+        self._after_commit.append(fn)
+
+    def after_rollback(self, fn):
+        self._after_rollback.append(fn)
+
+    async def run(self, fn, *args, **kwargs):
+        # Bir nechta so'rovni bitta oqimda ketma-ket bajarish uchun: fn(conn, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, self.conn, *args, **kwargs))
+
+    async def execute(self, sql: str, params=()):
+        return await self.run(_execute, sql, params)
+
+    async def executemany(self, sql: str, seq_of_params):
+        return await self.run(_executemany, sql, seq_of_params)
+
+    async def fetchone(self, sql: str, params=()):
+        return await self.run(_fetchone, sql, params)
+
+    async def fetchall(self, sql: str, params=()):
+        return await self.run(_fetchall, sql, params)
+
+    async def commit(self):
+        await self.run(_commit)
+        self._committed()
+
+    async def rollback(self):
+        hooks, self._after_rollback, self._after_commit = self._after_rollback, [], []
+        await self.run(_rollback, hooks)
+
+    async def finish(self):
+        # Sessiya oxirida: commit qilinmagan tranzaksiya bekor qilinadi, aks holda ish db.run ichida commit qilingan
+        if await self.run(_in_transaction):
+            await self.rollback()
+        else:
+            self._committed()
+
+    def _committed(self):
+        hooks, self._after_commit, self._after_rollback = self._after_commit, [], []
+        for fn in hooks:
+            fn()
+
+
+def _execute(conn, sql, params):
+    return conn.execute(sql, params)
+
+
+def _executemany(conn, sql, seq_of_params):
+    return conn.executemany(sql, seq_of_params)
+
+
+def _fetchone(conn, sql, params):
+    return conn.execute(sql, params).fetchone()
+
+
+def _fetchall(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+
+def _commit(conn):
+    conn.commit()
+
+
+def _rollback(conn, hooks=()):
+    conn.rollback()
+    for fn in hooks:
+        fn(conn)
+
+
+def _in_transaction(conn):
+    return conn.in_transaction
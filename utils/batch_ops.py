@@ -0,0 +1,103 @@
+import sqlite3
+from utils.file_upload import enqueue_release
+
+# Bir nechta create/update/delete amalini bitta tranzaksiyada bajarish.
+# resources: jadval -> (yoziladigan ustunlar, fayl ustunlari). Fayllar paket orqali yuklanmaydi,
+# o'chirilgan yozuvlarning fayllari esa shu tranzaksiyada bo'shatish navbatiga qo'yiladi.
+
+
+class BatchError(Exception):
+    pass
+
+
+def _create(conn, table: str, columns: tuple, operation) -> int:
+    unknown = set(operation.data) - set(columns)
+    if unknown:
+        raise BatchError(f"Unknown fields: {sorted(unknown)}")
+    names = [column for column in columns if column in operation.data]
+    if not names:
+        raise BatchError("No fields to create")
+    cursor = conn.execute(
+        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+        tuple(operation.data[column] for column in names),
+    )
+    return cursor.lastrowid
+
+
+def _update(conn, table: str, columns: tuple, operation) -> int:
+    unknown = set(operation.data) - set(columns)
+    if unknown:
+        raise BatchError(f"Unknown fields: {sorted(unknown)}")
+    if operation.id is None or not operation.data:
+        raise BatchError("Update needs id and data")
+    names = list(operation.data)
+    cursor = conn.execute(
+        f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in names)} WHERE id = ?",
+        (*(operation.data[column] for column in names), operation.id),
+    )
+    if cursor.rowcount == 0:
+        raise BatchError("Not found")
+    return operation.id
+
+
+def _delete(conn, table: str, file_columns: tuple, operation, released: list) -> int:
+    if operation.id is None:
+        raise BatchError("Delete needs id")
+    if file_columns:
+        row = conn.execute(f"SELECT {', '.join(file_columns)} FROM {table} WHERE id = ?", (operation.id,)).fetchone()
+        if row is None:
+            raise BatchError("Not found")
+        released.extend(link for link in row if link)
+    if conn.execute(f"DELETE FROM {table} WHERE id = ?", (operation.id,)).rowcount == 0:
+        raise BatchError("Not found")
+    return operation.id
+
+
+def apply_operations(conn, resources: dict, operations: list, atomic: bool = True) -> dict:
+    results, tables, released = [], set(), []
+    failed = False
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for index, operation in enumerate(operations):
+            if operation.resource not in resources:
+                results.append({"index": index, "status": "error", "error": f"Unknown resource: {operation.resource}"})
+                failed = True
+            else:
+                columns, file_columns = resources[operation.resource]
+                pending = []
+                # Har bir amal o'z savepoint'ida: atomic=False bo'lsa faqat shu amal bekor qilinadi
+                conn.execute("SAVEPOINT batch_operation")
+                try:
+                    if operation.op == "create":
+                        id = _create(conn, operation.resource, columns, operation)
+                    elif operation.op == "update":
+                        id = _update(conn, operation.resource, columns, operation)
+                    else:
+                        id = _delete(conn, operation.resource, file_columns, operation, pending)
+                    conn.execute("RELEASE batch_operation")
+                    results.append({"index": index, "status": "ok", "id": id})
+                    tables.add(operation.resource)
+                    released.extend(pending)
+                except (BatchError, sqlite3.IntegrityError, sqlite3.InterfaceError) as e:
+                    conn.execute("ROLLBACK TO batch_operation")
+                    conn.execute("RELEASE batch_operation")
+                    results.append({"index": index, "status": "error", "error": str(e)})
+                    failed = True
+            if failed and atomic:
+                break
+        if failed and atomic:
+            conn.rollback()
+            # Xatodan oldingi amallar bekor qilingan, keyingilari bajarilmagan
+            results = [
+                result if result["status"] == "error" else {**result, "status": "rolled_back", "id": None}
+                for result in results
+            ]
+            results.extend({"index": index, "status": "skipped", "id": None} for index in range(len(results), len(operations)))
+            return {"committed": False, "results": results, "tables": [], "released": []}
+        # O'chirilgan yozuvlarning fayllari shu tranzaksiyada bo'shatish navbatiga qo'yiladi
+        enqueue_release(conn, released)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return {"committed": True, "results": results, "tables": sorted(tables), "released": released}
@@ -0,0 +1,219 @@
+import csv
+import io
+import os
+import posixpath
+import sqlite3
+import time
+import zipfile
+import zlib
+import orjson
+from fastapi import HTTPException
+from pydantic import ValidationError
+from utils.file_upload import drop_orphan, enqueue_release, place_object, spool_file
+
+# Ommaviy import: fayl qatorma-qator o'qiladi, bo'laklab executemany bilan yoziladi.
+# Har bir bo'lak alohida tranzaksiya; xato qatorlar hisobotga yoziladi, qolganlari saqlanadi.
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+IMPORT_FORMATS = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}
+
+
+def import_format(filename: str):
+    return IMPORT_FORMATS.get((filename or "").rsplit(".", 1)[-1].lower())
+
+
+def _records(file, fmt: str):
+    # (fayldagi qator raqami, dict yoki xato matni)
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, {key: value for key, value in row.items() if isinstance(key, str)}
+        else:
+            for number, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    yield number, f"Invalid JSON: {e}"
+                    continue
+                yield number, record if isinstance(record, dict) else "Row must be a JSON object"
+    finally:
+        text.detach()
+
+
+def _clean(record: dict) -> dict:
+    cleaned = {}
+    for key, value in record.items():
+        if isinstance(value, str):
+            value = value.strip() or None
+        cleaned[key.strip()] = value
+    return cleaned
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+
+class _Report:
+    def __init__(self, source: str):
+        self.source = source
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def result(self) -> dict:
+        return {
+            "source": self.source,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(time.monotonic() - self.started, 3),
+        }
+
+
+def _flush(conn, sql: str, batch: list, report: _Report):
+    try:
+        conn.executemany(sql, [values for _, values in batch])
+        conn.commit()
+        report.inserted += len(batch)
+    except sqlite3.DatabaseError:
+        # Bo'lakda baza rad etgan qator bor: qatorma-qator qayta yoziladi, xatosi aniqlanadi
+        conn.rollback()
+        for row, values in batch:
+            try:
+                conn.execute(sql, values)
+                report.inserted += 1
+            except sqlite3.DatabaseError as e:
+                report.error(row, str(e))
+        conn.commit()
+    batch.clear()
+
+
+def import_rows(conn, table: str, model, file, fmt: str, prepare=None, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    # prepare(conn) -> check(item): qo'shimcha tekshiruv (masalan, bog'langan yozuv mavjudligi), xato matni yoki None
+    columns = list(model.model_fields)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    check = prepare(conn) if prepare else None
+    report = _Report(table)
+    batch = []
+    row = 0
+    try:
+        for row, record in _records(file, fmt):
+            if isinstance(record, str):
+                report.error(row, record)
+                continue
+            try:
+                item = model.model_validate(_clean(record))
+            except ValidationError as e:
+                report.error(row, _validation_message(e))
+                continue
+            problem = check(item) if check else None
+            if problem:
+                report.error(row, problem)
+                continue
+            batch.append((row, tuple(getattr(item, column) for column in columns)))
+            if len(batch) >= chunk_size:
+                _flush(conn, sql, batch, report)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Fayl buzilgan: shu joygacha o'qilgan qatorlar saqlanadi
+        report.error(row + 1, f"Unreadable file: {e}")
+    if batch:
+        _flush(conn, sql, batch, report)
+    return report.result()
+
+
+# ZIP arxivdagi PDF'larni kod bo'yicha yozuvlarga biriktirish: "ShNQ 2.01.01-19.pdf" -> code = "ShNQ 2.01.01-19"
+ATTACH_BATCH_SIZE = 50
+
+
+def _code_key(code: str) -> str:
+    return " ".join(code.split()).casefold()
+
+
+def _attach(conn, table: str, link_column: str, staged: list, report: dict):
+    # Bir bo'lakdagi fayllar bitta tranzaksiyada joyiga qo'yiladi va yozuvlarga biriktiriladi
+    updates, old_links, placed = [], [], []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for (tmp_path, file_path, digest, size), targets in staged:
+            link = "/" + file_path.replace(os.sep, "/")
+            if not place_object(conn, tmp_path, file_path, digest, size, refs=len(targets)):
+                placed.append(link)
+            for target in targets:
+                if target[1]:
+                    old_links.append(target[1])
+                updates.append((link, target[0]))
+        conn.executemany(f"UPDATE {table} SET {link_column} = ? WHERE id = ?", updates)
+        # Almashtirilgan eski fayllar commit'dan keyin release_files vazifasida bo'shatiladi
+        enqueue_release(conn, old_links)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        # Shu bo'lakda joylangan, hech bir yozuvga tegishli bo'lmagan fayllar o'chiriladi
+        for link in placed:
+            drop_orphan(link, conn)
+        raise
+    for (_, file_path, *_), targets in staged:
+        for target in targets:
+            target[1] = "/" + file_path.replace(os.sep, "/")
+    report["files"] += len(staged)
+    report["attached"] += len(updates)
+    report["replaced"] += len(old_links)
+    staged.clear()
+
+
+def attach_archive(conn, table: str, code_column: str, link_column: str, archive, upload_dir: str,
+                   batch_size: int = ATTACH_BATCH_SIZE) -> dict:
+    # Arxiv xotiraga yuklanmaydi: markaziy katalog o'qiladi, har bir fayl bo'laklab vaqtinchalik faylga ko'chiriladi
+    started = time.monotonic()
+    rows = {}
+    for id, code, link in conn.execute(f"SELECT id, {code_column}, {link_column} FROM {table}"):
+        rows.setdefault(_code_key(code), []).append([id, link])
+    report = {"source": table, "files": 0, "attached": 0, "replaced": 0, "unmatched": [], "errors": []}
+    staged = []
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                name = info.filename
+                base = posixpath.basename(name)
+                if info.is_dir() or name.startswith("__MACOSX/") or base.startswith("."):
+                    continue
+                stem, extension = posixpath.splitext(base)
+                if extension.lower() != ".pdf":
+                    report["errors"].append({"file": name, "error": "Not a PDF file"})
+                    continue
+                targets = rows.get(_code_key(stem))
+                if not targets:
+                    report["unmatched"].append(name)
+                    continue
+                try:
+                    with zf.open(info) as source:
+                        staged.append((spool_file(source, "pdf", upload_dir), targets))
+                except HTTPException as e:
+                    report["errors"].append({"file": name, "error": e.detail})
+                    continue
+                except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError) as e:
+                    # Buzilgan, shifrlangan yoki qo'llab-quvvatlanmagan siqish usuli
+                    report["errors"].append({"file": name, "error": str(e)})
+                    continue
+                if len(staged) >= batch_size:
+                    _attach(conn, table, link_column, staged, report)
+            if staged:
+                _attach(conn, table, link_column, staged, report)
+    finally:
+        for (tmp_path, *_), _ in staged:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir(database_path: str) -> str:
+    # Bitta mashinadagi bir nechta ilova nusxasi bir-birining keshini ko'rmasligi uchun baza yo'li bo'yicha nomlanadi
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    digest = hashlib.sha1(os.path.realpath(database_path).encode()).hexdigest()[:12]
+    return os.path.join(root, f"tmsiti-cache-{digest}")
+
+
+class MemoryBackend:
+    # Jarayon ichidagi kesh: har bir uvicorn workerida alohida nusxa
+    name = "memory"
+    shared = False
+    executor = None
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.epoch = f"{os.getpid():x}{time.time_ns():x}"
+        self._started = int(time.time())
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (body, media_type, tables, expires_at)
+        self._versions = {}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key: str, body: bytes, media_type: str, tables, ttl: float, versions: list) -> bool:
+        # versions - handler ishga tushishidan oldingi jadval versiyalari; o'zgargan bo'lsa javob eskirgan, yozilmaydi
+        with self._lock:
+            if [self._versions.get(table, (0, self._started)) for table in tables] != versions:
+                return False
+            self._entries[key] = (body, media_type, tuple(tables), time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, tables) -> int:
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if any(table in entry[2] for table in tables)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def bump(self, tables):
+        now = int(time.time())
+        with self._lock:
+            for table in tables:
+                version, modified = self._versions.get(table, (0, self._started))
+                # Last-Modified soniya aniqligida: har bir o'zgarish uni kamida 1 soniyaga oshiradi
+                self._versions[table] = (version + 1, max(now, modified + 1))
+
+    def versions(self, tables) -> list:
+        with self._lock:
+            return [self._versions.get(table, (0, self._started)) for table in tables]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": self.name, "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+class SQLiteBackend:
+    # Workerlar uchun umumiy kesh: /dev/shm dagi (xotiradagi) SQLite fayli.
+    # Versiyalar ham shu yerda, shuning uchun barcha workerlar bir xil ETag beradi.
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str, max_entries: int = 512):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        # Fayl I/O event loop'dan tashqarida, bitta oqimda: bekor qilish va undan keyingi o'qish navbat bilan bajariladi
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    media_type TEXT,
+                    tables TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_used_at ON entries(used_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    modified INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # Fayl yaratilgan paytdagi belgi: /dev/shm tozalansa (qayta yuklash) eski ETag'lar mos kelmaydi
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:16],))
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('started', ?)", (str(int(time.time())),))
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        self.epoch = meta["epoch"]
+        self._started = int(meta["started"])
+
+    def _conn(self):
+        # Har bir oqim o'z ulanishiga ega; yozuvlar qisqa, shuning uchun busy_timeout yetarli
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT body, media_type, expires_at, used_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[2] < now:
+            conn.execute("DELETE FROM entries WHERE key = ? AND expires_at < ?", (key, now))
+            return None
+        if row[3] < now - 1.0:
+            # Taxminiy LRU: har bir o'qishda yozmaslik uchun used_at soniyada bir marta yangilanadi
+            conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def set(self, key: str, body: bytes, media_type: str, tables, ttl: float, versions: list) -> bool:
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Tekshiruv yozuv bilan bitta tranzaksiyada: boshqa worker shu orada versiyani oshirgan bo'lsa javob eskirgan
+            if self.versions(tables) != versions:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, body, media_type, tables, expires_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, media_type, "," + ",".join(tables) + ",", now + ttl, now),
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used_at LIMIT ?)", (excess,)
+                )
+        return True
+
+    def invalidate(self, tables) -> int:
+        conn = self._conn()
+        removed = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in tables:
+                removed += conn.execute("DELETE FROM entries WHERE tables LIKE ?", (f"%,{table},%",)).rowcount
+        return removed
+
+    def bump(self, tables):
+        conn = self._conn()
+        now = int(time.time())
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in tables:
+                conn.execute(
+                    """
+                    INSERT INTO versions (name, version, modified) VALUES (?, 1, max(?, ? + 1))
+                    ON CONFLICT (name) DO UPDATE SET version = version + 1, modified = max(excluded.modified, modified + 1)
+                    """,
+                    (table, now, self._started),
+                )
+
+    def versions(self, tables) -> list:
+        placeholders = ", ".join("?" for _ in tables)
+        rows = dict(
+            (name, (version, modified)) for name, version, modified in
+            self._conn().execute(f"SELECT name, version, modified FROM versions WHERE name IN ({placeholders})", tuple(tables))
+        )
+        return [rows.get(table, (0, self._started)) for table in tables]
+
+    def stats(self) -> dict:
+        entries = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"backend": self.name, "entries": entries, "max_entries": self.max_entries, "path": self.path}
+
+
+async def call(backend, fn, *args):
+    # Bloklovchi backend (SQLite) amallari uning oqimida, xotiradagisi - to'g'ridan-to'g'ri
+    if backend.executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(backend.executor, fn, *args)
+
+
+def submit(backend, fn, *args):
+    # Natijasi kutilmaydigan amallar (invalidate, bump): table_changed sinxron qoladi, tartib saqlanadi
+    if backend.executor is None:
+        fn(*args)
+        return
+    backend.executor.submit(fn, *args).add_done_callback(_log_failure)
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("Cache backend operation failed", exc_info=future.exception())
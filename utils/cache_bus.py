@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from utils.db_events import remote_table_changed, set_broadcaster
+
+logger = logging.getLogger(__name__)
+
+
+class _BusProtocol(asyncio.DatagramProtocol):
+    def __init__(self, bus):
+        self.bus = bus
+
+    def datagram_received(self, data, addr):
+        self.bus.received(data)
+
+
+class CacheBus:
+    # Bir mashinadagi uvicorn workerlari o'rtasida jadval o'zgarishlarini tarqatish.
+    # Har bir worker papkada <pid>.sock Unix datagram soketini ochadi, xabar qolgan barcha soketlarga yuboriladi.
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = None
+        self._sender = None
+        self._transport = None
+        self.stats = {"peers": 0, "sent": 0, "received": 0, "dropped": 0}
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self.path)
+        sock.setblocking(False)
+        self._transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(lambda: _BusProtocol(self), sock=sock)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        set_broadcaster(self.publish)
+
+    def publish(self, tables):
+        payload = json.dumps(list(tables)).encode()
+        peers = 0
+        for name in os.listdir(self.directory):
+            peer = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or peer == self.path:
+                continue
+            try:
+                self._sender.sendto(payload, peer)
+                peers += 1
+                self.stats["sent"] += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker to'xtagan, soket fayli qolib ketgan
+                try:
+                    os.unlink(peer)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                # Qabul qiluvchining navbati to'la: yozuv TTL tugaguncha eskirgan bo'lib qolishi mumkin
+                self.stats["dropped"] += 1
+                logger.warning("Cache invalidation for %s dropped: %s is not reading", tables, peer)
+        self.stats["peers"] = peers
+
+    def received(self, data: bytes):
+        try:
+            tables = json.loads(data)
+        except ValueError:
+            return
+        self.stats["received"] += 1
+        remote_table_changed(*tables)
+
+    async def stop(self):
+        set_broadcaster(None)
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._sender is not None:
+            self._sender.close()
+            self._sender = None
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,35 @@
+# Jadval o'zgarishlari haqida xabar beruvchi oddiy mexanizm.
+# Routerlar yozuvdan keyin table_changed("news") chaqiradi, keshlar esa subscribe() orqali tinglaydi.
+# Bir nechta worker bo'lsa, xabar utils.cache_bus orqali boshqa jarayonlarga ham yetkaziladi.
+
+_listeners = []
+_broadcaster = None
+
+
+def subscribe(listener=None, *, local: bool = True, remote: bool = True):
+    # local - shu jarayondagi yozuvlar, remote - boshqa workerdan kelgan xabarlar
+    if listener is None:
+        return lambda fn: subscribe(fn, local=local, remote=remote)
+    _listeners.append((listener, local, remote))
+    return listener
+
+
+def set_broadcaster(broadcaster):
+    global _broadcaster
+    _broadcaster = broadcaster
+
+
+def _notify(tables, remote: bool):
+    for listener, local, on_remote in list(_listeners):
+        if on_remote if remote else local:
+            listener(tables)
+
+
+def table_changed(*tables: str):
+    _notify(tables, remote=False)
+    if _broadcaster is not None:
+        _broadcaster(tables)
+
+
+def remote_table_changed(*tables: str):
+    _notify(tables, remote=True)
@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PoolClosed(Exception):
+    pass
+
+
+def parse_pragmas(value: str) -> dict:
+    # "foreign_keys=ON;busy_timeout=5000" -> {"foreign_keys": "ON", "busy_timeout": "5000"}
+    pragmas = {}
+    for item in (value or "").split(";"):
+        if "=" not in item:
+            continue
+        name, setting = item.split("=", 1)
+        pragmas[name.strip()] = setting.strip()
+    return pragmas
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        database: str,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        pragmas: dict = None,
+        health_check_interval: float = 30.0,
+    ):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = {}  # conn -> oxirgi ishlatilgan vaqt
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+
+        # Monitoring uchun metrikalar
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._peak_in_use = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # PRAGMA'lar har bir ulanish uchun faqat bir marta, yaratilganda qo'llanadi
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _take_idle(self):
+        # Eng oxirgi qaytarilgan ("issiq") bo'sh ulanish. Oqimga bog'lash yo'q: AsyncDB ulanishni
+        # har safar db_executor'ning istalgan oqimida ishlatadi
+        if self._idle:
+            conn = next(reversed(self._idle))
+            return conn, self._idle.pop(conn)
+        return None, None
+
+    def _checkout(self, deadline: float):
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise PoolClosed("Connection pool is closed")
+                conn, last_used = self._take_idle()
+                reserved = False
+                if conn is None and self._size < self.max_size:
+                    # Yangi ulanish uchun joy band qilinadi, ulanish qulfdan tashqarida ochiladi
+                    self._size += 1
+                    reserved = True
+                if conn is not None or reserved:
+                    self._in_use += 1
+                    self._peak_in_use = max(self._peak_in_use, self._in_use)
+                    if waited:
+                        self._waits += 1
+                    return conn, last_used
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            conn, last_used = self._checkout(deadline)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+                break
+            if self._is_healthy(conn, last_used):
+                break
+            self._discard(conn)
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_time += waited
+            self._max_wait_time = max(self._max_wait_time, waited)
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle[conn] = time.monotonic()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "peak_in_use": self._peak_in_use,
+                "saturation": self._in_use / self.max_size if self.max_size else 0.0,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": self._wait_time,
+                "wait_time_avg": self._wait_time / self._checkouts if self._checkouts else 0.0,
+                "wait_time_max": self._max_wait_time,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+
+# journal_mode bazaning o'zida saqlanadi, qolganlari har bir ulanish uchun alohida
+PERSISTENT_PRAGMAS = ("journal_mode",)
+
+
+def connection_pragmas(profile: dict) -> dict:
+    return {name: value for name, value in profile.items() if name not in PERSISTENT_PRAGMAS}
+
+
+def apply_storage_profile(conn, profile: dict) -> dict:
+    applied = {}
+    for name, value in profile.items():
+        row = conn.execute(f"PRAGMA {name} = {value}").fetchone()
+        applied[name] = row[0] if row else value
+    return applied
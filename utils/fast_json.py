@@ -0,0 +1,128 @@
+import asyncio
+import orjson
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from dependencies import db_executor, db_session
+
+# Tezkor yo'l: bazadagi qatorlar to'g'ridan-to'g'ri orjson bilan baytlarga aylantiriladi.
+# Handler Response qaytargani uchun FastAPI response_model orqali qayta tekshirmaydi;
+# response_model esa OpenAPI hujjati uchun qoladi. Faqat ustunlari modelga mos jadvallar uchun.
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+def model_columns(model) -> list:
+    return list(model.model_fields)
+
+
+def select_columns(model, computed: dict = None) -> str:
+    # computed: maydon -> SQL ifodasi (jadvalda ustuni yo'q, hisoblanadigan maydonlar uchun)
+    computed = computed or {}
+    return ", ".join(f"{computed[name]} AS {name}" if name in computed else name for name in model_columns(model))
+
+
+def _dump_rows(conn, sql: str, args: tuple) -> bytes:
+    cursor = conn.execute(sql, args)
+    names = [column[0] for column in cursor.description]
+    return orjson.dumps([dict(zip(names, row)) for row in cursor])
+
+
+async def json_list(db, model, table: str, *, where: str = "", args: tuple = (), order_by: str = "", limit: int = None,
+                    computed: dict = None):
+    sql = f"SELECT {select_columns(model, computed)} FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        args = (*args, limit)
+    # So'rov ham, serializatsiya ham db executor'ida - event loop band bo'lmaydi
+    return JSONBytesResponse(await db.run(_dump_rows, sql, tuple(args)))
+
+
+def json_page(page: dict, model) -> JSONBytesResponse:
+    # utils.pagination.paginate natijasi (items - sqlite3.Row qatorlari)
+    fields = model_columns(model)
+    items = [{field: row[field] for field in fields} for row in page["items"]]
+    return JSONBytesResponse(orjson.dumps({**page, "items": items}))
+
+
+# Eksport: qatorlar fetchmany bilan bo'laklab o'qiladi, xotira jadval hajmiga bog'liq emas
+STREAM_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _dump_batch(cursor, names: list, batch_size: int, ndjson: bool, first: bool) -> bytes:
+    rows = cursor.fetchmany(batch_size)
+    if ndjson:
+        return b"".join(orjson.dumps(dict(zip(names, row)), option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+    chunk = b",".join(orjson.dumps(dict(zip(names, row))) for row in rows)
+    return chunk if first or not chunk else b"," + chunk
+
+
+async def _stream_rows(sql: str, args: tuple, ndjson: bool, batch_size: int):
+    # Ulanish get_db'dan emas, tana o'qila boshlaganda olinadi va oqim tugaguncha (yoki uzilguncha) band turadi.
+    # Tana umuman o'qilmasa, ulanish olinmaydi
+    loop = asyncio.get_running_loop()
+    async with db_session() as db:
+        cursor = await db.execute(sql, args)
+        try:
+            names = [column[0] for column in cursor.description]
+            if not ndjson:
+                yield b"["
+            first = True
+            while True:
+                chunk = await loop.run_in_executor(db_executor, _dump_batch, cursor, names, batch_size, ndjson, first)
+                if not chunk:
+                    break
+                first = False
+                yield chunk
+            if not ndjson:
+                yield b"]"
+        finally:
+            await loop.run_in_executor(db_executor, cursor.close)
+
+
+class RowStreamResponse(StreamingResponse):
+    def __init__(self, sql: str, args: tuple, ndjson: bool, batch_size: int):
+        super().__init__(
+            _stream_rows(sql, args, ndjson, batch_size),
+            media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+        )
+
+    async def stream_response(self, send):
+        # Birinchi bo'lak (ulanish va so'rov) sarlavhalardan oldin olinadi: baza band bo'lsa 503 qaytarish mumkin
+        first = await anext(self.body_iterator, None)
+        body_iterator = self.body_iterator
+
+        async def chunks():
+            if first is not None:
+                yield first
+            async for chunk in body_iterator:
+                yield chunk
+
+        self.body_iterator = chunks()
+        try:
+            await super().stream_response(send)
+        finally:
+            self.body_iterator = body_iterator
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Mijoz uzilsa ham ulanish havzaga qaytariladi (oqim boshlanmagan bo'lsa, ulanish olinmagan)
+            await self.body_iterator.aclose()
+
+
+def stream_rows(model, table: str, *, where: str = "", args: tuple = (), order_by: str = "id",
+                ndjson: bool = False, batch_size: int = STREAM_BATCH_SIZE) -> RowStreamResponse:
+    sql = f"SELECT {', '.join(model_columns(model))} FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    return RowStreamResponse(sql, tuple(args), ndjson, batch_size)
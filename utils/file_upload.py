@@ -1,21 +1,251 @@
 import os
+import asyncio
+import hashlib
+import tempfile
+import threading
+import time
+from functools import partial
 from fastapi import UploadFile, HTTPException
-import shutil
 from datetime import datetime
+from utils.db_events import table_changed
+from utils.jobs import enqueue_job, job_handler
+from utils.images import remove_derivatives, request_derivatives
 
-async def save_file(file: UploadFile, allowed_extensions: list[str], upload_dir: str = "uploads"):
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
-    
+CHUNK_SIZE = 1024 * 1024
+
+# Kategoriya (upload papkasi nomi) bo'yicha maksimal fayl hajmi
+MB = 1024 * 1024
+MAX_UPLOAD_SIZES = {
+    "news": 10 * MB,
+    "announcements": 10 * MB,
+    "management": 10 * MB,
+    "departments": 10 * MB,
+    "structure": 20 * MB,
+    "contact": 20 * MB,
+    "institute": 50 * MB,
+    "anticorruption": 50 * MB,
+    "laws": 100 * MB,
+    "norm_documents": 100 * MB,
+    "standards": 100 * MB,
+    "regulations": 100 * MB,
+    "resource_norms": 100 * MB,
+    "reference_docs": 100 * MB,
+}
+DEFAULT_MAX_UPLOAD_SIZE = 50 * MB
+
+# mkstemp fayllarni 0600 bilan yaratadi; saqlangan fayllar odatdagi open() kabi umask bo'yicha o'qiladigan bo'ladi
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+# Monitoring uchun yuklash metrikalari
+_stats_lock = threading.Lock()
+upload_stats = {"files": 0, "bytes": 0, "seconds": 0.0, "rejected": 0, "deduplicated": 0, "last_bytes_per_sec": 0.0}
+
+def init_file_objects_table(conn):
+    # Fayllar kontent bo'yicha saqlanadi: uploads/<kategoriya>/ab/cd/<sha256>.<kengaytma>
+    # ref_count - fayl nechta baza yozuvida ishlatilayotgani
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_objects (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+    """)
+
+
+def get_upload_stats() -> dict:
+    with _stats_lock:
+        stats = dict(upload_stats)
+    stats["avg_bytes_per_sec"] = stats["bytes"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def _record(written: int, elapsed: float):
+    with _stats_lock:
+        upload_stats["files"] += 1
+        upload_stats["bytes"] += written
+        upload_stats["seconds"] += elapsed
+        upload_stats["last_bytes_per_sec"] = written / elapsed if elapsed else 0.0
+
+
+def _too_large(max_size: int):
+    with _stats_lock:
+        upload_stats["rejected"] += 1
+    return HTTPException(status_code=413, detail=f"File is too large. Maximum size: {max_size // MB} MB")
+
+
+def _write(buffer, hasher, chunk: bytes):
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def place_object(conn, tmp_path: str, file_path: str, digest: str, size: int, refs: int = 1) -> bool:
+    # Chaqiruvchi yozuv tranzaksiyasini (BEGIN IMMEDIATE) ochgan bo'lishi kerak:
+    # parallel release_file fayl o'chirayotgan paytda nusxa yo'qolmaydi
+    link = "/" + file_path.replace(os.sep, "/")
+    duplicate = os.path.exists(file_path)
+    if duplicate:
+        os.unlink(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.chmod(tmp_path, FILE_MODE)
+        # Fayl to'liq yozilgandan keyingina o'z nomi bilan paydo bo'ladi
+        os.replace(tmp_path, file_path)
+    conn.execute(
+        """
+        INSERT INTO file_objects (path, sha256, size, ref_count, created_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (path) DO UPDATE SET ref_count = ref_count + excluded.ref_count
+        """,
+        (link, digest, size, refs, datetime.utcnow().isoformat()),
+    )
+    return duplicate
+
+
+def _store_object(conn, buffer, tmp_path: str, file_path: str, digest: str, size: int) -> bool:
+    buffer.close()
+    # Fayl yozuvi so'rovning o'z ulanishida, unga havola qiluvchi yozuv bilan bitta tranzaksiyada saqlanadi:
+    # handler commit qilmasa ref_count ham bekor bo'ladi
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    return place_object(conn, tmp_path, file_path, digest, size)
+
+
+def drop_orphan(link: str, conn):
+    # Tranzaksiya bekor qilindi: yangi joylangan fayl hech bir yozuvga tegishli bo'lmasa o'chiriladi
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM file_objects WHERE path = ?", (link,)).fetchone() is None:
+            try:
+                os.unlink(link.lstrip("/"))
+            except FileNotFoundError:
+                pass
+    finally:
+        conn.rollback()
+
+
+def spool_file(source, extension: str, upload_dir: str):
+    # Sinxron variant (oqimlar havzasida): fayl-obyektni vaqtinchalik faylga bo'laklab yozadi va xeshlaydi.
+    # (tmp_path, file_path, digest, size) qaytaradi; joyiga qo'yish - place_object
+    max_size = MAX_UPLOAD_SIZES.get(os.path.basename(os.path.normpath(upload_dir)), DEFAULT_MAX_UPLOAD_SIZE)
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=upload_dir)
+    buffer = os.fdopen(fd, "wb")
+    hasher = hashlib.sha256()
+    written = 0
+    started = time.monotonic()
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_size:
+                raise _too_large(max_size)
+            _write(buffer, hasher, chunk)
+        buffer.close()
+    except BaseException:
+        _discard(buffer, tmp_path)
+        raise
+    _record(written, time.monotonic() - started)
+    digest = hasher.hexdigest()
+    return tmp_path, os.path.join(upload_dir, digest[:2], digest[2:4], f"{digest}.{extension}"), digest, written
+
+
+def release_links(conn, links):
+    # Chaqiruvchining yozuv tranzaksiyasida: ref_count kamaytiriladi, 0 bo'lsa fayl o'chiriladi.
+    # Fayl qulf ostida o'chiriladi: parallel place_object uni mavjud deb hisoblab qolmaydi
+    for link in links:
+        row = conn.execute("SELECT ref_count FROM file_objects WHERE path = ?", (link,)).fetchone()
+        if row is None:
+            continue  # eski (kontent-manzilsiz) fayl
+        if row[0] > 1:
+            conn.execute("UPDATE file_objects SET ref_count = ref_count - 1 WHERE path = ?", (link,))
+            continue
+        conn.execute("DELETE FROM file_objects WHERE path = ?", (link,))
+        try:
+            os.unlink(link.lstrip("/"))
+        except FileNotFoundError:
+            pass
+        remove_derivatives(conn, link)
+
+
+@job_handler("release_files", transactional=True)
+def _release_job(conn, payload):
+    # ref_count kamaytirish va vazifaning "done" holati bitta commit'da: qayta bajarilgan vazifa ikkinchi marta kamaytirmaydi
+    release_links(conn, payload["links"])
+
+
+def enqueue_release(conn, links) -> bool:
+    links = [link for link in links if link]
+    if not links:
+        return False
+    enqueue_job(conn, "release_files", {"links": links})
+    return True
+
+
+async def release_file(db, *links):
+    # Baza yozuvi o'chirilganda yoki fayli almashtirilganda, handler commit'idan oldin chaqiriladi.
+    # Bo'shatish vazifasi o'zgarish bilan bitta tranzaksiyada saqlanadi va fonda bajariladi (utils.jobs)
+    if await db.run(enqueue_release, links):
+        db.after_commit(partial(table_changed, "jobs"))
+
+
+def _discard(buffer, tmp_path: str):
+    if not buffer.closed:
+        buffer.close()
+    try:
+        os.unlink(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_file(db, file: UploadFile, allowed_extensions: list[str], upload_dir: str = "uploads"):
+    # Chaqiruvchi (handler) yozuvni saqlab commit qiladi: fayl va havola birga saqlanadi yoki birga bekor bo'ladi
     extension = file.filename.split(".")[-1].lower()
     if extension not in allowed_extensions:
         raise HTTPException(status_code=400, detail=f"File extension {extension} not allowed. Allowed: {allowed_extensions}")
-    
-    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(upload_dir, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    return f"/{file_path}"
+
+    category = os.path.basename(os.path.normpath(upload_dir))
+    max_size = MAX_UPLOAD_SIZES.get(category, DEFAULT_MAX_UPLOAD_SIZE)
+    if file.size is not None and file.size > max_size:
+        raise _too_large(max_size)
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, lambda: os.makedirs(upload_dir, exist_ok=True))
+
+    fd, tmp_path = await loop.run_in_executor(None, lambda: tempfile.mkstemp(prefix=".upload-", dir=upload_dir))
+    buffer = os.fdopen(fd, "wb")
+    hasher = hashlib.sha256()
+    written = 0
+    started = time.monotonic()
+    try:
+        # Fayl bo'laklab o'qiladi, yozish bilan birga xeshlanadi, event loop'dan tashqarida
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_size:
+                raise _too_large(max_size)
+            await loop.run_in_executor(None, _write, buffer, hasher, chunk)
+        digest = hasher.hexdigest()
+        file_path = os.path.join(upload_dir, digest[:2], digest[2:4], f"{digest}.{extension}")
+        duplicate = await db.run(_store_object, buffer, tmp_path, file_path, digest, written)
+    except BaseException:
+        await loop.run_in_executor(None, _discard, buffer, tmp_path)
+        raise
+    _record(written, time.monotonic() - started)
+    link = "/" + file_path.replace(os.sep, "/")
+    if duplicate:
+        with _stats_lock:
+            upload_stats["deduplicated"] += 1
+    else:
+        db.after_rollback(partial(drop_orphan, link))
+
+    # Rasmlar uchun kichraytirilgan nusxalar fon vazifasida yaratiladi (utils.images)
+    if await db.run(request_derivatives, link):
+        db.after_commit(partial(table_changed, "jobs"))
+    return link
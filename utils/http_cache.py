@@ -0,0 +1,62 @@
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request
+from utils.cache_backend import MemoryBackend, call, submit
+from utils.db_events import subscribe
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class TableVersions:
+    # Har bir jadval uchun versiya raqami va oxirgi o'zgarish vaqti (ETag / Last-Modified manbai).
+    # Qiymatlar kesh backend'ida saqlanadi; backend belgisi (epoch) o'zgarsa eski ETag'lar mos kelmaydi.
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def versions(self, tables) -> list:
+        return await call(self.backend, self.backend.versions, tables)
+
+    def validators(self, versions: list) -> tuple:
+        etag = '"{}-{}"'.format(self.backend.epoch, ".".join(str(version) for version, _ in versions))
+        return etag, max(modified for _, modified in versions)
+
+    def on_changed(self, tables):
+        submit(self.backend, self.backend.bump, tables)
+
+    def on_remote_changed(self, tables):
+        # Umumiy backend'da versiyani yozuv bo'lgan worker allaqachon oshirgan
+        if not self.backend.shared:
+            submit(self.backend, self.backend.bump, tables)
+
+
+table_versions = TableVersions(MemoryBackend())
+subscribe(table_versions.on_changed, remote=False)
+subscribe(table_versions.on_remote_changed, local=False)
+
+
+def versioned(*tables: str):
+    # Ro'yxat endpointiga ETag / Last-Modified qo'shish (CachedRoute bilan ishlaydi)
+    def decorator(endpoint):
+        endpoint.version_tables = tables
+        return endpoint
+    return decorator
+
+
+def validator_headers(etag: str, last_modified: float) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        # Brauzer va CDN har safar qayta tekshiradi, lekin o'zgarmagan bo'lsa 304 oladi
+        "Cache-Control": "public, no-cache",
+    }
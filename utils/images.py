@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import tempfile
+from datetime import datetime
+from PIL import Image, ImageOps
+from dependencies import db_pool
+from utils.db_events import table_changed
+from utils.jobs import enqueue_job, job_handler
+
+# Yuklangan rasmlarning kichraytirilgan nusxalari (WebP va JPEG, bir nechta kenglikda) fon vazifasida yaratiladi
+# va asl fayl yonida saqlanadi: x.png -> x.png.w320.webp, x.png.w320.jpg, ... EXIF va boshqa metama'lumotlar yozilmaydi.
+# Nomda asl kengaytma qoladi: bir xil kontentli x.jpg va x.png obyektlarining nusxalari alohida.
+# API javoblarida srcset (WebP) va srcset_jpeg maydonlari image_variants jadvalidan olinadi.
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "webp")
+IMAGE_WIDTHS = (320, 640, 1280)
+IMAGE_TABLES = ("announcements", "news", "anticorruption", "management", "structure", "departments")
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# fast_json.select_columns uchun: jadvalning image ustuniga mos srcset'lar
+SRCSET_COLUMNS = {
+    "srcset": "(SELECT srcset FROM image_variants WHERE image_variants.path = image)",
+    "srcset_jpeg": "(SELECT srcset_jpeg FROM image_variants WHERE image_variants.path = image)",
+}
+
+
+def init_image_variants_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_variants (
+            path TEXT PRIMARY KEY,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            widths TEXT NOT NULL,
+            srcset TEXT NOT NULL,
+            srcset_jpeg TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+
+
+def is_image(link: str) -> bool:
+    return bool(link) and link.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+
+
+def derivative_path(file_path: str, width: int, extension: str) -> str:
+    return f"{file_path}.w{width}.{extension}"
+
+
+def _legacy_derivative_path(file_path: str, width: int, extension: str) -> str:
+    # Avvalgi nomlash (x.w320.webp): 4-migratsiyadan keyin hech bir srcset'da ishlatilmaydi
+    return f"{os.path.splitext(file_path)[0]}.w{width}.{extension}"
+
+
+def derivative_widths(width: int) -> list:
+    # Kattalashtirilmaydi: eng katta kenglikdan tor rasm uchun oxirgi nusxa asl kenglikda
+    widths = [target for target in IMAGE_WIDTHS if target < width]
+    if width <= IMAGE_WIDTHS[-1]:
+        widths.append(width)
+    return widths
+
+
+def _save(image, file_path: str, extension: str, mode: int):
+    image_format, options = DERIVATIVE_FORMATS[extension]
+    if image_format == "JPEG" and image.mode != "RGB":
+        # Shaffof fon oq rangga almashtiriladi
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    fd, tmp_path = tempfile.mkstemp(prefix=".derivative-", dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            image.save(buffer, image_format, **options)
+        # mkstemp 0600 bilan yaratadi: nusxa asl fayl bilan bir xil ruxsatlarda bo'ladi
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def make_derivatives(link: str) -> bool:
+    # False - hech narsa o'zgarmadi (nusxalar allaqachon bor yoki asl fayl o'chirilgan)
+    with db_pool.connection() as conn:
+        if conn.execute("SELECT 1 FROM image_variants WHERE path = ?", (link,)).fetchone():
+            return False
+    file_path = link.lstrip("/")
+    try:
+        source = Image.open(file_path)
+    except FileNotFoundError:
+        return False
+    with source:
+        mode = os.stat(file_path).st_mode & 0o777
+        # Telefon rasmlari EXIF bo'yicha buriladi, keyin EXIF tashlab yuboriladi
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+        width, height = image.size
+        widths = derivative_widths(width)
+        srcsets = {extension: [] for extension in DERIVATIVE_FORMATS}
+        for target in widths:
+            resized = image if target == width else image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            for extension in DERIVATIVE_FORMATS:
+                path = derivative_path(file_path, target, extension)
+                _save(resized, path, extension, mode)
+                srcsets[extension].append(f"/{path.replace(os.sep, '/')} {target}w")
+    with db_pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if not os.path.exists(file_path):
+            # Asl fayl shu orada o'chirilgan: nusxalar ham kerak emas
+            conn.rollback()
+            for target in widths:
+                for extension in DERIVATIVE_FORMATS:
+                    os.unlink(derivative_path(file_path, target, extension))
+            return False
+        conn.execute(
+            "INSERT OR REPLACE INTO image_variants (path, width, height, widths, srcset, srcset_jpeg, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (link, width, height, json.dumps(widths), ", ".join(srcsets["webp"]), ", ".join(srcsets["jpg"]), datetime.utcnow().isoformat()),
+        )
+        conn.commit()
+    for target in widths:
+        for extension in DERIVATIVE_FORMATS:
+            try:
+                os.unlink(_legacy_derivative_path(file_path, target, extension))
+            except FileNotFoundError:
+                pass
+    return True
+
+
+def remove_derivatives(conn, link: str):
+    # Asl fayl o'chirilganda chaqiriladi (chaqiruvchining tranzaksiyasida)
+    row = conn.execute("SELECT widths FROM image_variants WHERE path = ?", (link,)).fetchone()
+    if row is None:
+        return
+    conn.execute("DELETE FROM image_variants WHERE path = ?", (link,))
+    for width in json.loads(row[0]):
+        for extension in DERIVATIVE_FORMATS:
+            try:
+                os.unlink(derivative_path(link.lstrip("/"), width, extension))
+            except FileNotFoundError:
+                pass
+
+
+@job_handler("image_derivatives", max_attempts=3)
+async def _derivatives_job(payload):
+    if await asyncio.get_running_loop().run_in_executor(None, make_derivatives, payload["link"]):
+        table_changed("image_variants")
+
+
+def request_derivatives(conn, link: str) -> bool:
+    # Yuklash tranzaksiyasida navbatga qo'yiladi; chaqiruvchi commit'dan keyin table_changed("jobs") chaqiradi
+    if not is_image(link):
+        return False
+    enqueue_job(conn, "image_derivatives", {"link": link}, priority=5)
+    return True
+
+
+def enqueue_missing_derivatives(conn):
+    # Ilgari yuklangan rasmlar uchun: nusxasi ham, navbatdagi vazifasi ham yo'q rasmlar navbatga qo'yiladi
+    links = set()
+    for table in IMAGE_TABLES:
+        links.update(row[0] for row in conn.execute(
+            f"SELECT DISTINCT image FROM {table} WHERE image IS NOT NULL "
+            "AND image NOT IN (SELECT path FROM image_variants)"
+        ))
+    queued = {row[0] for row in conn.execute("SELECT payload FROM jobs WHERE kind = 'image_derivatives' AND status IN ('pending', 'running')")}
+    for link in sorted(links):
+        if is_image(link) and json.dumps({"link": link}) not in queued:
+            enqueue_job(conn, "image_derivatives", {"link": link})
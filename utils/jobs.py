@@ -0,0 +1,294 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dependencies import db_pool
+from utils.db_events import subscribe, table_changed
+
+logger = logging.getLogger(__name__)
+
+# So'rovdan keyingi sekin ishlar uchun SQLite'dagi vazifalar navbati.
+# Handler job_handler("kind") bilan ro'yxatdan o'tadi, so'rov esa submit_job()/enqueue_job() bilan vazifa qo'shib darhol qaytadi.
+# Yuqori priority avval bajariladi. Bajarish "kamida bir marta": worker to'xtab qolsa, ijara tugagach vazifa qayta olinadi.
+DEFAULT_MAX_ATTEMPTS = 5
+
+_handlers = {}
+
+
+def init_jobs_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_at REAL NOT NULL,
+            locked_until REAL,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            finished_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, run_at)")
+
+
+def job_handler(kind: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS, transactional: bool = False):
+    # handler(payload) - oddiy funksiya (oqimda bajariladi) yoki async funksiya.
+    # transactional=True: handler(conn, payload) ochiq yozuv tranzaksiyasida bajariladi va vazifaning "done" holati
+    # shu tranzaksiyada commit qilinadi - qayta ishga tushirilgan vazifa natijani ikki marta qo'llamaydi
+    def register(fn):
+        _handlers[kind] = (fn, max_attempts, transactional)
+        return fn
+    return register
+
+
+def enqueue_job(conn, kind: str, payload=None, priority: int = 0, delay: float = 0, max_attempts: int = None) -> int:
+    # Chaqiruvchi commit qiladi va table_changed("jobs") chaqiradi: vazifa asosiy yozuv bilan birga saqlanadi
+    if max_attempts is None:
+        max_attempts = _handlers.get(kind, (None, DEFAULT_MAX_ATTEMPTS, False))[1]
+    cursor = conn.execute(
+        "INSERT INTO jobs (kind, payload, priority, max_attempts, run_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (kind, json.dumps(payload), priority, max_attempts, time.time() + delay, datetime.utcnow().isoformat()),
+    )
+    return cursor.lastrowid
+
+
+async def submit_job(kind: str, payload=None, **options) -> int:
+    def store():
+        with db_pool.connection() as conn:
+            id = enqueue_job(conn, kind, payload, **options)
+            conn.commit()
+            return id
+    id = await asyncio.get_running_loop().run_in_executor(None, store)
+    table_changed("jobs")
+    return id
+
+
+class JobRunner:
+    def __init__(
+        self,
+        pool,
+        concurrency: int = 4,
+        lease: float = 600.0,
+        interval: float = 30.0,
+        backoff: float = 5.0,
+        max_backoff: float = 3600.0,
+        drain_timeout: float = 20.0,
+        keep_done: float = 7 * 86400,
+    ):
+        self.pool = pool
+        self.concurrency = concurrency
+        self.lease = lease
+        self.interval = interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.drain_timeout = drain_timeout
+        self.keep_done = keep_done
+        self._executor = None
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self._running = set()
+        self._pruned_at = 0.0
+        self.stats = {"done": 0, "failed": 0, "dead": 0, "interrupted": 0}
+        # Boshqa workerda qo'shilgan vazifani ham olish mumkin
+        subscribe(self._on_tables_changed)
+
+    def _claim(self, conn, limit: int) -> list:
+        # Muddati o'tgan "running" - to'xtab qolgan workerning vazifasi, qayta olinadi
+        now = time.time()
+        rows = conn.execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE (status = 'pending' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?)
+                ORDER BY priority DESC, id LIMIT ?
+            )
+            RETURNING id, kind, payload, priority, attempts, max_attempts, locked_until
+            """,
+            (now + self.lease, now, now, limit),
+        ).fetchall()
+        conn.commit()
+        return sorted((tuple(row) for row in rows), key=lambda row: (-row[3], row[0]))
+
+    def _next_due(self, conn):
+        row = conn.execute(
+            "SELECT MIN(CASE status WHEN 'pending' THEN run_at ELSE locked_until END) FROM jobs WHERE status IN ('pending', 'running')"
+        ).fetchone()
+        return row[0]
+
+    # lease - claim paytidagi locked_until: vazifa boshqa urinishga o'tgan bo'lsa (ijara tugagan, navbatga qaytarilgan)
+    # eski urinish uning holatini o'zgartirmaydi
+
+    def _finish(self, conn, id: int, lease: float):
+        conn.execute(
+            "UPDATE jobs SET status = 'done', locked_until = NULL, error = NULL, finished_at = ? WHERE id = ? AND locked_until = ?",
+            (datetime.utcnow().isoformat(), id, lease),
+        )
+        conn.commit()
+
+    def _fail(self, conn, id: int, lease: float, attempts: int, max_attempts: int, error: str):
+        # Urinishlar tugasa vazifa "dead" bo'lib qoladi (dead-letter): qo'lda ko'rib chiqish uchun o'chirilmaydi
+        if attempts >= max_attempts:
+            conn.execute(
+                "UPDATE jobs SET status = 'dead', locked_until = NULL, error = ?, finished_at = ? WHERE id = ? AND locked_until = ?",
+                (error, datetime.utcnow().isoformat(), id, lease),
+            )
+        else:
+            delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', locked_until = NULL, error = ?, run_at = ? WHERE id = ? AND locked_until = ?",
+                (error, time.time() + delay, id, lease),
+            )
+        conn.commit()
+
+    def _release(self, conn, id: int, lease: float):
+        # To'xtatilgan vazifa navbatga qaytadi, urinish hisoblanmaydi
+        conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = attempts - 1, locked_until = NULL, run_at = ? WHERE id = ? AND locked_until = ?",
+            (time.time(), id, lease),
+        )
+        conn.commit()
+
+    def _run_in_transaction(self, fn, id: int, lease: float, payload) -> bool:
+        # False - vazifa bu urinishga tegishli emas (boshqa urinish bajargan yoki navbatga qaytarilgan)
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM jobs WHERE id = ? AND status = 'running' AND locked_until = ?", (id, lease)).fetchone() is None:
+                    conn.rollback()
+                    return False
+                fn(conn, payload)
+                self._finish(conn, id, lease)
+            except BaseException:
+                conn.rollback()
+                raise
+        return True
+
+    def _prune(self, conn):
+        conn.execute(
+            "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?",
+            (datetime.utcfromtimestamp(time.time() - self.keep_done).isoformat(),),
+        )
+        conn.commit()
+
+    async def _db(self, fn, *args):
+        def call():
+            with self.pool.connection() as conn:
+                return fn(conn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+    async def _execute(self, id: int, kind: str, payload: str, attempts: int, max_attempts: int, lease: float):
+        handler = _handlers.get(kind)
+        finished = False
+        try:
+            if handler is None:
+                raise LookupError(f"Unknown job kind: {kind}")
+            fn, _, transactional = handler
+            loop = asyncio.get_running_loop()
+            if transactional:
+                finished = await loop.run_in_executor(self._executor, self._run_in_transaction, fn, id, lease, json.loads(payload))
+                if not finished:
+                    logger.warning("Job %s (%s) lease lost, result discarded", id, kind)
+                    return
+            elif inspect.iscoroutinefunction(fn):
+                await fn(json.loads(payload))
+            else:
+                await loop.run_in_executor(self._executor, fn, json.loads(payload))
+        except asyncio.CancelledError:
+            self.stats["interrupted"] += 1
+            with self.pool.connection() as conn:
+                self._release(conn, id, lease)
+            raise
+        except Exception as e:
+            logger.warning("Job %s (%s) failed on attempt %s: %s", id, kind, attempts, e)
+            # Noma'lum turdagi vazifa qayta urinilmaydi
+            limit = max_attempts if handler else attempts
+            self.stats["dead" if attempts >= limit else "failed"] += 1
+            await self._db(self._fail, id, lease, attempts, limit, f"{type(e).__name__}: {e}"[:1000])
+        else:
+            self.stats["done"] += 1
+            if not finished:
+                await self._db(self._finish, id, lease)
+
+    def _done(self, task):
+        self._running.discard(task)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            free = self.concurrency - len(self._running)
+            if free > 0:
+                try:
+                    if time.time() - self._pruned_at > 3600:
+                        self._pruned_at = time.time()
+                        await self._db(self._prune)
+                    claimed = await self._db(self._claim, free)
+                except Exception:
+                    logger.exception("Job queue check failed")
+                    claimed = []
+                for job in claimed:
+                    task = self._loop.create_task(self._execute(job[0], job[1], job[2], job[4], job[5], job[6]))
+                    self._running.add(task)
+                    task.add_done_callback(self._done)
+                if len(claimed) == free:
+                    # Bo'sh joy qolmadi: biror vazifa tugashi bilan uyg'onadi
+                    await self._wake.wait()
+                    continue
+            timeout = self.interval
+            try:
+                due = await self._db(self._next_due)
+                if due is not None:
+                    timeout = min(timeout, max(due - time.time(), 0) + 0.05)
+            except Exception:
+                logger.exception("Job queue check failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def request(self):
+        # Har qanday oqimdan chaqirish mumkin
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        self._task = self._loop.create_task(self._run())
+
+    def _on_tables_changed(self, tables):
+        if "jobs" in tables:
+            self.request()
+
+    async def stop(self):
+        # Yangi vazifa olinmaydi; bajarilayotganlari drain_timeout gacha kutiladi, qolganlari navbatga qaytariladi
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        if self._running:
+            _, pending = await asyncio.wait(set(self._running), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def running(self) -> int:
+        return len(self._running)
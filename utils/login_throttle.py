@@ -0,0 +1,77 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+class LoginThrottle:
+    # Sirpanuvchi oyna: kalit (username yoki IP) bo'yicha window soniya ichida max_attempts dan ortiq
+    # muvaffaqiyatsiz urinish bo'lsa, eng eski urinish oynadan chiqquncha yangi urinishlar rad etiladi.
+    # Urinish bcrypt'dan oldin yoziladi (bir vaqtdagi so'rovlar ham hisobga olinadi), muvaffaqiyatli
+    # bo'lsa attempt() qaytargan belgi bo'yicha aynan shu urinish qaytarib olinadi.
+    def __init__(self, max_attempts: int, window: float, max_keys: int = 10000):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._attempts = {}
+        self.blocked = 0
+
+    def _recent(self, key, now: float):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
+
+    def retry_after(self, key) -> int:
+        # 0 - urinishga ruxsat, aks holda necha soniyadan keyin qayta urinish mumkin
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._recent(key, now)
+            if attempts is None or len(attempts) < self.max_attempts:
+                return 0
+            self.blocked += 1
+            return max(1, math.ceil(attempts[0] + self.window - now))
+
+    def attempt(self, key) -> float:
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._recent(key, now)
+            if attempts is None:
+                if len(self._attempts) >= self.max_keys:
+                    self._prune(now)
+                attempts = self._attempts[key] = deque()
+            attempts.append(now)
+        return now
+
+    def succeeded(self, key, attempt: float, forget_all: bool = False):
+        # Parallel muvaffaqiyatsiz urinishlar saqlanadi; forget_all - kalitning barcha urinishlari o'chiriladi
+        with self._lock:
+            attempts = self._attempts.get(key)
+            if not attempts:
+                return
+            if forget_all:
+                del self._attempts[key]
+                return
+            try:
+                attempts.remove(attempt)
+            except ValueError:
+                pass  # oynadan allaqachon chiqqan
+            if not attempts:
+                del self._attempts[key]
+
+    def _prune(self, now: float):
+        for key in list(self._attempts):
+            self._recent(key, now)
+        # Baribir to'lib qolgan bo'lsa, eng eski kalitlar chiqariladi
+        while len(self._attempts) >= self.max_keys:
+            self._attempts.pop(next(iter(self._attempts)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tracked": len(self._attempts), "blocked": self.blocked}
@@ -0,0 +1,428 @@
+import argparse
+import logging
+import sqlite3
+import sys
+from datetime import datetime
+from utils.file_upload import init_file_objects_table
+from utils.images import init_image_variants_table
+from utils.jobs import init_jobs_table
+from utils.notifications import init_outbox_table
+from utils.pdf_index import init_pdf_text_table
+from utils.search import init_search_index
+
+logger = logging.getLogger(__name__)
+
+# Sxema migratsiyalari: init_schema boshlang'ich jadvallarni yaratadi (0-versiya), keyingi o'zgarishlar
+# shu yerda raqamlangan migratsiya sifatida yoziladi va schema_version jadvalida qayd etiladi.
+# Har bir migratsiya o'z tranzaksiyasida bajariladi; --dry-run bazaning xotiradagi nusxasida bajaradi.
+# CLI: python -m utils.migrations [--dry-run] [--check-plans]
+MIGRATIONS = []
+
+
+def migration(version: int, name: str):
+    def register(fn):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migration {version} must be greater than {MIGRATIONS[-1][0]}")
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def init_schema_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def current_version(conn) -> int:
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def pending_migrations(conn) -> list:
+    applied = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+    return [item for item in MIGRATIONS if item[0] not in applied]
+
+
+def _columns(conn, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def migrate(conn) -> list:
+    init_schema(conn)
+    init_schema_version_table(conn)
+    report = []
+    # Jadvallarni qayta qurish uchun tashqi kalitlar vaqtincha o'chiriladi (tranzaksiya ichida o'zgartirib bo'lmaydi)
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, name, fn in pending_migrations(conn):
+            statements = []
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Boshqa worker shu orada bajargan bo'lishi mumkin
+                if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                    conn.rollback()
+                    continue
+                conn.set_trace_callback(statements.append)
+                try:
+                    fn(conn)
+                finally:
+                    conn.set_trace_callback(None)
+                violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.utcnow().isoformat()),
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            if violations:
+                # Eski ma'lumotlardagi bog'lanmagan yozuvlar: migratsiya to'xtatilmaydi, faqat xabar beriladi
+                logger.warning("Migration %s: %s rows violate foreign keys", version, len(violations))
+            report.append({
+                "version": version,
+                "name": name,
+                "statements": [sql.strip() for sql in statements if not sql.lstrip().upper().startswith(("SELECT", "PRAGMA", "--"))],
+                "foreign_key_violations": len(violations),
+            })
+            logger.info("Applied migration %s %s", version, name)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+    return report
+
+
+# Tez-tez ishlatiladigan so'rovlar indeks orqali bajarilishi kerak: (nom, so'rov, kutilgan indeks)
+QUERY_PLAN_CHECKS = (
+    ("norm documents by group", "SELECT * FROM norm_documents WHERE norm_id = 1 AND group_id = 1", "idx_norm_documents_group_id"),
+    ("norm groups by norm", "SELECT * FROM norm_groups WHERE norm_id = 1", "idx_norm_groups_norm_id"),
+    ("related news", "SELECT * FROM news ORDER BY date DESC LIMIT 5", "idx_news_date_id"),
+    ("standards page", "SELECT * FROM standards ORDER BY code, id LIMIT 20", "idx_standards_code_id"),
+    ("regulations page", "SELECT * FROM regulations ORDER BY code, id LIMIT 20", "idx_regulations_code_id"),
+    ("resource norms page", "SELECT * FROM resource_norms ORDER BY code, id LIMIT 20", "idx_resource_norms_code_id"),
+    ("laws page", "SELECT * FROM laws ORDER BY adopted_date DESC, id DESC LIMIT 20", "idx_laws_adopted_date_id"),
+    ("laws by authority", "SELECT * FROM laws WHERE issuing_authority = 'x' ORDER BY adopted_date DESC, id DESC LIMIT 20", "idx_laws_authority_adopted_date"),
+    ("user by username", "SELECT * FROM users WHERE username = 'admin'", "sqlite_autoindex_users_1"),
+)
+
+
+def check_query_plans(conn) -> list:
+    # Muammolar ro'yxati: kutilgan indeks ishlatilmagan yoki qo'shimcha saralash kerak bo'lgan so'rovlar
+    problems = []
+    for name, sql, index in QUERY_PLAN_CHECKS:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        if not any(f"INDEX {index}" in step for step in plan) or any("TEMP B-TREE" in step for step in plan):
+            problems.append({"query": name, "expected_index": index, "plan": plan})
+    return problems
+
+
+def init_schema(conn):
+    # 0-versiya: boshlang'ich jadvallar (CREATE ... IF NOT EXISTS). Bo'sh bazada ham, eski bazada ham
+    # raqamlangan migratsiyalardan oldin bajariladi; indekslar va keyingi o'zgarishlar - migratsiyalarda
+    # Contacts jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            message TEXT NOT NULL,
+            file TEXT
+        )
+    """)
+    # Users jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL
+        )
+    """)
+    # Institute info jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS institute_info (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            charter_pdf TEXT,
+            statute_pdf TEXT
+        )
+    """)
+    # Management jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS management (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image TEXT,
+            position TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            specialty TEXT
+        )
+    """)
+    # Structure jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS structure (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image TEXT NOT NULL
+        )
+    """)
+    # Departments jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS departments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image TEXT,
+            name TEXT NOT NULL,
+            head TEXT NOT NULL,
+            head_phone TEXT,
+            head_email TEXT
+        )
+    """)
+    # Vacancies jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vacancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            position TEXT NOT NULL,
+            department TEXT NOT NULL,
+            requirements TEXT NOT NULL,
+            status TEXT NOT NULL
+        )
+    """)
+    # Announcements jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS announcements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            date TEXT NOT NULL,
+            image TEXT,
+            link TEXT
+        )
+    """)
+    # News jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS news (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            date TEXT NOT NULL,
+            image TEXT
+        )
+    """)
+    # Anticorruption jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS anticorruption (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            minister_message TEXT,
+            date TEXT NOT NULL,
+            image TEXT,
+            document_link TEXT,
+            telegram_link TEXT
+        )
+    """)
+    # Laws jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS laws (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            order_number TEXT NOT NULL,
+            adopted_date TEXT NOT NULL,
+            effective_date TEXT NOT NULL,
+            issuing_authority TEXT NOT NULL,
+            link TEXT
+        )
+    """)
+    # Urban norms jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS urban_norms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            norm_name TEXT NOT NULL
+        )
+    """)
+    # Norm groups jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS norm_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            norm_id INTEGER NOT NULL,
+            group_name TEXT NOT NULL
+        )
+    """)
+    # Norm documents jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS norm_documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            norm_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            code TEXT NOT NULL,
+            name TEXT NOT NULL,
+            link TEXT
+        )
+    """)
+    # Standards, regulations va resource norms jadvallari
+    for table in ("standards", "regulations", "resource_norms"):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT NOT NULL,
+                name TEXT NOT NULL,
+                pdf_link TEXT
+            )
+        """)
+    # Reference docs jadvali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reference_docs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            pdf_link TEXT
+        )
+    """)
+    # Yuklangan fayllar uchun havolalar hisoblagichi
+    init_file_objects_table(conn)
+    # Telegram bildirishnomalari navbati
+    init_outbox_table(conn)
+    # Fon vazifalari navbati
+    init_jobs_table(conn)
+    # Rasmlarning kichraytirilgan nusxalari
+    init_image_variants_table(conn)
+    # Hujjatlar bo'yicha to'liq matnli qidiruv (FTS5) va sinxronlovchi triggerlar
+    init_pdf_text_table(conn)
+    init_search_index(conn)
+    conn.commit()
+
+
+@migration(1, "contacts_subject_and_file")
+def _contacts_subject_and_file(conn):
+    # Avvalgi update_db_schema: eski bazalarda contacts jadvalida bu ustunlar yo'q
+    columns = _columns(conn, "contacts")
+    if "subject" not in columns:
+        conn.execute("ALTER TABLE contacts ADD COLUMN subject TEXT NOT NULL DEFAULT ''")
+    if "file" not in columns:
+        conn.execute("ALTER TABLE contacts ADD COLUMN file TEXT")
+
+
+def _norm_indexes(conn):
+    # get_norm_groups (norm_id = ?), get_norm_documents (norm_id = ? AND group_id = ?) va normalar daraxti JOIN'i
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_norm_groups_norm_id ON norm_groups (norm_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_norm_documents_group_id ON norm_documents (group_id, norm_id)")
+
+
+@migration(2, "lookup_indexes")
+def _lookup_indexes(conn):
+    # Ro'yxat sahifalari indekslari - 5-migratsiyada; users.username UNIQUE cheklovi indeksini o'zi yaratadi
+    _norm_indexes(conn)
+
+
+def _rebuild(conn, table: str, create_sql: str, columns: list):
+    # SQLite mavjud jadvalga tashqi kalit qo'sha olmaydi: yangi jadval yaratiladi, ma'lumot ko'chiriladi, nomi almashtiriladi
+    conn.execute(create_sql.format(table=f"{table}_new"))
+    names = ", ".join(columns)
+    conn.execute(f"INSERT INTO {table}_new ({names}) SELECT {names} FROM {table}")
+    # AUTOINCREMENT hisoblagichi saqlanadi: o'chirilgan id'lar qayta berilmaydi
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    if row is not None:
+        if conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = ?", (f"{table}_new",)).fetchone():
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (row[0], f"{table}_new"))
+        else:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (f"{table}_new", row[0]))
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+@migration(3, "norm_foreign_keys")
+def _norm_foreign_keys(conn):
+    _rebuild(conn, "norm_groups", """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            norm_id INTEGER NOT NULL REFERENCES urban_norms (id),
+            group_name TEXT NOT NULL
+        )
+    """, ["id", "norm_id", "group_name"])
+    _rebuild(conn, "norm_documents", """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            norm_id INTEGER NOT NULL REFERENCES urban_norms (id),
+            group_id INTEGER NOT NULL REFERENCES norm_groups (id),
+            code TEXT NOT NULL,
+            name TEXT NOT NULL,
+            link TEXT
+        )
+    """, ["id", "norm_id", "group_id", "code", "name", "link"])
+    # Eski jadval bilan birga o'chgan indekslar va qidiruv triggerlari qayta yaratiladi
+    _norm_indexes(conn)
+    init_search_index(conn)
+
+
+@migration(4, "image_variant_names")
+def _image_variant_names(conn):
+    # Nusxa nomlariga asl kengaytma qo'shildi (x.png.w320.webp): eski yozuvlar o'chiriladi va nusxalar fonda qayta yaratiladi.
+    # Eski nomli fayllarni make_derivatives yangi nusxalarni saqlagach o'chiradi
+    from utils.images import enqueue_missing_derivatives
+    conn.execute("DELETE FROM image_variants")
+    enqueue_missing_derivatives(conn)
+
+
+@migration(5, "listing_indexes")
+def _listing_indexes(conn):
+    # Ilgari main.init_db da yaratilgan sahifalash va filtr indekslari (eski bazalarda allaqachon bor)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_date_id ON news (date, id)")
+    for table in ("standards", "regulations", "resource_norms"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_code_id ON {table} (code, id)")
+    # Hujjatlar reyestri filtrlari
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_laws_adopted_date_id ON laws (adopted_date, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_laws_authority_adopted_date ON laws (issuing_authority, adopted_date, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_laws_order_number ON laws (order_number)")
+
+
+@migration(6, "pdf_text_leases")
+def _pdf_text_leases(conn):
+    # Bir faylni ikki worker bir vaqtda ajratmasligi uchun ijara ustuni
+    if "locked_until" not in _columns(conn, "pdf_texts"):
+        conn.execute("ALTER TABLE pdf_texts ADD COLUMN locked_until REAL")
+
+
+def main(argv=None):
+    from dependencies import DATABASE_PATH
+    parser = argparse.ArgumentParser(prog="python -m utils.migrations")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="bajarib ko'rish va bekor qilish")
+    parser.add_argument("--check-plans", action="store_true", help="EXPLAIN QUERY PLAN tekshiruvlari")
+    args = parser.parse_args(argv)
+    conn = sqlite3.connect(args.database)
+    target = conn
+    try:
+        if args.dry_run:
+            # Asl baza o'zgarmaydi: migratsiyalar (va --check-plans) xotiradagi nusxada bajariladi
+            target = sqlite3.connect(":memory:")
+            conn.backup(target)
+        init_schema_version_table(target)
+        print(f"Current version: {current_version(target)}")
+        for item in migrate(target):
+            print(f"{'Would apply' if args.dry_run else 'Applied'} {item['version']} {item['name']}")
+            for sql in item["statements"]:
+                print(f"    {' '.join(sql.split())}")
+            if item["foreign_key_violations"]:
+                print(f"    foreign key violations: {item['foreign_key_violations']}")
+        if args.check_plans:
+            problems = check_query_plans(target)
+            for problem in problems:
+                print(f"Plan check failed: {problem['query']} (expected {problem['expected_index']}): {problem['plan']}")
+            if problems:
+                return 1
+            print(f"Query plans OK ({len(QUERY_PLAN_CHECKS)} checks)")
+    finally:
+        if target is not conn:
+            target.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
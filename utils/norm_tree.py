@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import orjson
+from utils.db_events import subscribe
+
+# Shaharsozlik normalari daraxti: norma -> guruhlar -> hujjatlar.
+# Bitta JOIN bilan quriladi va tayyor JSON bayt ko'rinishida saqlanadi; uchala jadvaldan biri o'zgarsa
+# (boshqa workerda ham) eskiradi va birinchi so'rovda qayta quriladi.
+NORM_TREE_TABLES = ("urban_norms", "norm_groups", "norm_documents")
+
+NORM_TREE_SQL = """
+    SELECT n.id, n.norm_name, g.id, g.group_name, d.id, d.code, d.name, d.link
+    FROM urban_norms n
+    LEFT JOIN norm_groups g ON g.norm_id = n.id
+    LEFT JOIN norm_documents d ON d.group_id = g.id AND d.norm_id = n.id
+    ORDER BY n.id, g.id, d.id
+"""
+
+
+def build_norm_tree(conn) -> bytes:
+    norms = []
+    norm = group = None
+    for norm_id, norm_name, group_id, group_name, document_id, code, name, link in conn.execute(NORM_TREE_SQL):
+        if norm is None or norm["id"] != norm_id:
+            norm = {"id": norm_id, "norm_name": norm_name, "groups": []}
+            norms.append(norm)
+            group = None
+        if group_id is None:
+            continue
+        if group is None or group["id"] != group_id:
+            group = {"id": group_id, "group_name": group_name, "documents": []}
+            norm["groups"].append(group)
+        if document_id is not None:
+            group["documents"].append({"id": document_id, "code": code, "name": name, "link": link})
+    return orjson.dumps(norms)
+
+
+class NormTree:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = asyncio.Lock()
+        self._body = None
+        self._generation = 0
+        self.hits = 0
+        self.builds = 0
+
+    async def load(self, db) -> bytes:
+        body = self._body
+        if body is not None:
+            self.hits += 1
+            return body
+        # Bir vaqtda kelgan so'rovlar daraxtni bir marta quradi
+        async with self._build_lock:
+            body = self._body
+            if body is None:
+                generation = self._generation
+                body = await db.run(build_norm_tree)
+                self.builds += 1
+                with self._lock:
+                    # Qurish paytida jadval o'zgargan bo'lsa, eski daraxt saqlanmaydi
+                    if generation == self._generation:
+                        self._body = body
+        return body
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._body = None
+
+    def stats(self) -> dict:
+        return {"cached": self._body is not None, "size": len(self._body or b""), "hits": self.hits, "builds": self.builds}
+
+
+norm_tree = NormTree()
+
+
+@subscribe
+def _invalidate_norm_tree(tables):
+    if any(table in NORM_TREE_TABLES for table in tables):
+        norm_tree.invalidate()
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from utils.db_events import subscribe
+
+logger = logging.getLogger(__name__)
+
+# Telegram xabarlari uchun outbox: xabar so'rov tranzaksiyasida yoziladi, fon dispetcheri yuboradi.
+# Yetkazish "kamida bir marta": worker yuborish paytida to'xtasa, ijara muddati tugagach qayta yuboriladi.
+TELEGRAM_MAX_CHARS = 4096
+DIGEST_SEPARATOR = "\n\n———\n\n"
+
+
+def init_outbox_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            locked_until REAL,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox (status, next_attempt_at)")
+
+
+def enqueue_notification(conn, chat_id: str, text: str) -> int:
+    # Chaqiruvchi commit qiladi: xabar asosiy yozuv bilan birga saqlanadi yoki birga bekor bo'ladi
+    cursor = conn.execute(
+        "INSERT INTO notification_outbox (chat_id, text, created_at) VALUES (?, ?, ?)",
+        (str(chat_id), text, datetime.utcnow().isoformat()),
+    )
+    return cursor.lastrowid
+
+
+class RetryAfter(Exception):
+    # Transport cheklovga uchradi: shuncha soniya kutish kerak (urinish hisoblanmaydi)
+    def __init__(self, seconds: float):
+        super().__init__(f"Rate limited, retry after {seconds}s")
+        self.seconds = seconds
+
+
+class TelegramTransport:
+    # Bitta uzoq yashovchi Bot va HTTP sessiya; har bir xabar uchun yangisi ochilmaydi
+    name = "telegram"
+
+    def __init__(self, token: str):
+        self.token = token
+        self._bot = None
+
+    async def send(self, chat_id: str, text: str):
+        from aiogram import Bot
+        from aiogram.exceptions import TelegramRetryAfter
+        if self._bot is None:
+            self._bot = Bot(token=self.token)
+        try:
+            # Markdown o'rniga oddiy matn sifatida yuborish
+            await self._bot.send_message(chat_id=chat_id, text=text)
+        except TelegramRetryAfter as e:
+            raise RetryAfter(e.retry_after)
+
+    async def close(self):
+        if self._bot is not None:
+            await self._bot.session.close()
+            self._bot = None
+
+
+class StubTransport:
+    # Lokal ishlab chiqish va testlar uchun: xabarlar tarmoqqa chiqmaydi, ro'yxatda saqlanadi.
+    # errors ga qo'shilgan istisnolar navbatdagi yuborishlarda ketma-ket ko'tariladi.
+    name = "stub"
+
+    def __init__(self):
+        self.sent = []
+        self.errors = []
+
+    async def send(self, chat_id: str, text: str):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+        logger.info("Notification to %s:\n%s", chat_id, text)
+
+    async def close(self):
+        pass
+
+
+def _digests(items: list, threshold: int) -> list:
+    # items: bitta chat uchun [(id, text)]. Oqim (threshold va undan ko'p xabar) bitta yoki bir nechta
+    # umumlashtirilgan xabarga birlashtiriladi; Telegram chegarasidan oshmaydi.
+    if len(items) < threshold:
+        return [([id], text[:TELEGRAM_MAX_CHARS]) for id, text in items]
+    header = f"{len(items)} ta yangi xabar\n\n"
+    digests, ids, parts, length = [], [], [], len(header)
+    for id, text in items:
+        text = text[:TELEGRAM_MAX_CHARS - len(header)]
+        extra = len(text) + (len(DIGEST_SEPARATOR) if parts else 0)
+        if parts and length + extra > TELEGRAM_MAX_CHARS:
+            digests.append((ids, header + DIGEST_SEPARATOR.join(parts)))
+            ids, parts, length = [], [], len(header)
+            extra = len(text)
+        ids.append(id)
+        parts.append(text)
+        length += extra
+    digests.append((ids, header + DIGEST_SEPARATOR.join(parts)))
+    return digests
+
+
+class NotificationDispatcher:
+    def __init__(
+        self,
+        pool,
+        transport,
+        batch_size: int = 50,
+        digest_threshold: int = 3,
+        send_interval: float = 1.0,
+        max_attempts: int = 8,
+        backoff: float = 5.0,
+        max_backoff: float = 3600.0,
+        lease: float = 120.0,
+        interval: float = 60.0,
+    ):
+        self.pool = pool
+        self.transport = transport
+        self.batch_size = batch_size
+        self.digest_threshold = digest_threshold
+        self.send_interval = send_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.interval = interval
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self.stats = {"transport": transport.name, "sent": 0, "messages": 0, "digests": 0, "failed": 0, "dead": 0, "rate_limited": 0}
+        subscribe(self._on_tables_changed, remote=False)
+
+    def _claim(self, conn) -> list:
+        # Bir nechta worker bir xil xabarni olmasligi uchun yozuvlar ijaraga olinadi (locked_until)
+        now = time.time()
+        rows = conn.execute(
+            """
+            UPDATE notification_outbox SET locked_until = ?
+            WHERE id IN (
+                SELECT id FROM notification_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ? AND (locked_until IS NULL OR locked_until <= ?)
+                ORDER BY id LIMIT ?
+            )
+            RETURNING id, chat_id, text, attempts
+            """,
+            (now + self.lease, now, now, self.batch_size),
+        ).fetchall()
+        conn.commit()
+        return sorted(tuple(row) for row in rows)
+
+    def _next_due(self, conn):
+        row = conn.execute(
+            "SELECT MIN(MAX(next_attempt_at, COALESCE(locked_until, 0))) FROM notification_outbox WHERE status = 'pending'"
+        ).fetchone()
+        return row[0]
+
+    def _mark_sent(self, conn, ids: list):
+        now = datetime.utcnow().isoformat()
+        conn.executemany(
+            "UPDATE notification_outbox SET status = 'sent', sent_at = ?, locked_until = NULL, error = NULL WHERE id = ?",
+            [(now, id) for id in ids],
+        )
+        conn.commit()
+
+    def _mark_failed(self, conn, ids: list, attempts: dict, error: str):
+        updates = []
+        for id in ids:
+            attempt = attempts[id] + 1
+            status = "dead" if attempt >= self.max_attempts else "pending"
+            delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+            updates.append((status, attempt, time.time() + delay, error, id))
+            if status == "dead":
+                self.stats["dead"] += 1
+        conn.executemany(
+            "UPDATE notification_outbox SET status = ?, attempts = ?, next_attempt_at = ?, locked_until = NULL, error = ? WHERE id = ?",
+            updates,
+        )
+        conn.commit()
+
+    def _postpone(self, conn, ids: list, until: float):
+        conn.executemany(
+            "UPDATE notification_outbox SET next_attempt_at = ?, locked_until = NULL WHERE id = ?",
+            [(until, id) for id in ids],
+        )
+        conn.commit()
+
+    async def _db(self, fn, *args):
+        def call():
+            with self.pool.connection() as conn:
+                return fn(conn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+    async def run_once(self) -> bool:
+        # True - navbatda yana yuboriladigan xabarlar bo'lishi mumkin
+        rows = await self._db(self._claim)
+        if not rows:
+            return False
+        attempts = {row[0]: row[3] for row in rows}
+        chats = {}
+        for id, chat_id, text, _ in rows:
+            chats.setdefault(chat_id, []).append((id, text))
+        outgoing = [(chat_id, ids, text) for chat_id, items in chats.items() for ids, text in _digests(items, self.digest_threshold)]
+        for index, (chat_id, ids, text) in enumerate(outgoing):
+            try:
+                await self.transport.send(chat_id, text)
+            except RetryAfter as e:
+                # Telegram cheklovi: qolgan xabarlar urinish sarflanmasdan keyinga suriladi
+                self.stats["rate_limited"] += 1
+                remaining = [id for _, pending, _ in outgoing[index:] for id in pending]
+                await self._db(self._postpone, remaining, time.time() + e.seconds)
+                return False
+            except Exception as e:
+                logger.warning("Notification delivery failed for %s: %s", chat_id, e)
+                self.stats["failed"] += 1
+                await self._db(self._mark_failed, ids, attempts, str(e)[:500])
+            else:
+                await self._db(self._mark_sent, ids)
+                self.stats["sent"] += 1
+                self.stats["messages"] += len(ids)
+                if len(ids) > 1:
+                    self.stats["digests"] += 1
+            if index + 1 < len(outgoing):
+                await asyncio.sleep(self.send_interval)
+        return len(rows) >= self.batch_size
+
+    def request(self):
+        # Har qanday oqimdan chaqirish mumkin
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            more = False
+            try:
+                more = await self.run_once()
+            except Exception:
+                logger.exception("Notification dispatch pass failed")
+            if more:
+                await asyncio.sleep(self.send_interval)
+                continue
+            timeout = self.interval
+            try:
+                due = await self._db(self._next_due)
+                if due is not None:
+                    timeout = min(timeout, max(due - time.time(), 0) + 0.05)
+            except Exception:
+                logger.exception("Notification outbox check failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            # Qisqa kutish: bir vaqtda kelgan xabarlar bitta umumlashtirilgan xabarga yig'iladi
+            await asyncio.sleep(self.send_interval)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def _on_tables_changed(self, tables):
+        if "notification_outbox" in tables:
+            self.request()
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.transport.close()
@@ -0,0 +1,141 @@
+import base64
+import json
+import math
+import time
+import threading
+from typing import Optional
+from fastapi import HTTPException, Query
+from utils.db_events import subscribe
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class PageParams:
+    def __init__(
+        self,
+        page: int = Query(1, ge=1),
+        size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+    ):
+        self.page = page
+        self.size = size
+        self.cursor = cursor
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+class CountCache:
+    # COUNT(*) natijalari jadval o'zgarmaguncha (yoki TTL tugaguncha) qayta hisoblanmaydi
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts = {}  # (table, where, args) -> (count, expires_at)
+        self._generations = {}  # table -> int
+
+    def generation(self, table: str) -> int:
+        return self._generations.get(table, 0)
+
+    def get(self, table: str, where: str, args: tuple):
+        entry = self._counts.get((table, where, args))
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def set(self, table: str, where: str, args: tuple, count: int, generation: int):
+        with self._lock:
+            # Hisoblash paytida jadval o'zgargan bo'lsa, eskirgan qiymat saqlanmaydi
+            if self._generations.get(table, 0) == generation:
+                self._counts[(table, where, args)] = (count, time.monotonic() + self.ttl)
+                # Filtr kombinatsiyalari ko'p bo'lishi mumkin: eng eski yozuvlar chiqarib tashlanadi
+                while len(self._counts) > self.max_entries:
+                    del self._counts[next(iter(self._counts))]
+
+    def invalidate(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._counts = {key: value for key, value in self._counts.items() if key[0] not in tables}
+
+
+count_cache = CountCache()
+subscribe(lambda tables: count_cache.invalidate(*tables))
+
+
+def prefix_range(column: str, prefix: str):
+    # LIKE 'x%' o'rniga oraliq: oddiy indeks bilan ishlaydi
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return f"{column} >= ? AND {column} < ?", (prefix, upper)
+
+
+def _count(conn, table, where, args):
+    clause = f" WHERE {where}" if where else ""
+    return conn.execute(f"SELECT COUNT(*) FROM {table}{clause}", args).fetchone()[0]
+
+
+async def paginate(
+    db,
+    table: str,
+    params: PageParams,
+    *,
+    columns: str = "*",
+    where: str = "",
+    args: tuple = (),
+    order_by: tuple = ("id",),
+    descending: bool = False,
+):
+    args = tuple(args)
+    total = count_cache.get(table, where, args)
+    if total is None:
+        generation = count_cache.generation(table)
+        total = await db.run(_count, table, where, args)
+        count_cache.set(table, where, args, total, generation)
+
+    direction = "DESC" if descending else "ASC"
+    order = ", ".join(f"{column} {direction}" for column in order_by)
+    conditions = [f"({where})"] if where else []
+    query_args = list(args)
+    if params.cursor:
+        # Keyset: oxirgi ko'rilgan order_by qiymatlaridan keyingi qatorlar, OFFSET'siz
+        values = decode_cursor(params.cursor, len(order_by))
+        keys = ", ".join(order_by)
+        marks = ", ".join("?" for _ in order_by)
+        conditions.append(f"({keys}) {'<' if descending else '>'} ({marks})")
+        query_args.extend(values)
+        offset = 0
+        page = None
+    else:
+        offset = (params.page - 1) * params.size
+        page = params.page
+    clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = await db.fetchall(
+        f"SELECT {columns} FROM {table}{clause} ORDER BY {order} LIMIT ? OFFSET ?",
+        (*query_args, params.size, offset),
+    )
+
+    next_cursor = None
+    if len(rows) == params.size:
+        next_cursor = encode_cursor(rows[-1][column] for column in order_by)
+    return {
+        "items": rows,
+        "total": total,
+        "page": page,
+        "size": params.size,
+        "pages": math.ceil(total / params.size) if total else 0,
+        "next_cursor": next_cursor,
+    }
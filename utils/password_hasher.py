@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+
+
+class PasswordHasher:
+    # bcrypt hisoblari event loop'dan tashqarida, alohida kichik oqimlar havzasida bajariladi
+    # (bcrypt GIL'ni bo'shatadi). Navbat chegaralangan: u to'lsa yangi urinish darhol 503 oladi,
+    # shuning uchun login to'lqini ochiq sahifalarni ham, db_executor'ni ham band qilmaydi.
+    def __init__(self, context, workers: int = 2, max_pending: int = 32):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"verified": 0, "hashed": 0, "rejected": 0, "peak_pending": 0}
+
+    async def _run(self, counter: str, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many login attempts in progress, try again later",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self.stats[counter] += 1
+            self.stats["peak_pending"] = max(self.stats["peak_pending"], self._pending)
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._done()
+            raise
+        # Hisob tugaganda kamaytiriladi: so'rov bekor qilinsa ham oqim band bo'lib turadi
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verified", self.context.verify, password, hashed)
+
+    async def dummy_verify(self) -> bool:
+        # Mavjud bo'lmagan foydalanuvchi uchun ham bir xil vaqt sarflanadi (username'ni vaqt bo'yicha aniqlab bo'lmaydi)
+        return await self._run("verified", self.context.dummy_verify)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hashed", self.context.hash, password)
+
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pypdf import PdfReader
+from utils.db_events import subscribe, table_changed
+from utils.search import ROWID_STRIDE, SEARCH_SOURCES
+
+logger = logging.getLogger(__name__)
+
+# Qidiruvga kiruvchi hujjatlar PDF'lari saqlanadigan papkalar
+PDF_INDEX_DIRS = (
+    "uploads/laws",
+    "uploads/norm_documents",
+    "uploads/standards",
+    "uploads/regulations",
+    "uploads/resource_norms",
+    "uploads/reference_docs",
+)
+MAX_TEXT_CHARS = 2_000_000
+
+
+def init_pdf_text_table(conn):
+    # path - bazadagi havola ko'rinishida ("/uploads/standards/x.pdf")
+    # locked_until - "running" faylning ijara muddati (boshqa worker shu faylni qayta olmaydi)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pdf_texts (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT,
+            body TEXT,
+            indexed_at TEXT,
+            locked_until REAL
+        )
+    """)
+
+
+def extract_pdf_text(file_path: str) -> str:
+    # Alohida jarayonda ishlaydi: pypdf CPU'ni band qiladi
+    reader = PdfReader(file_path)
+    parts, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return "\n".join(parts)[:MAX_TEXT_CHARS]
+
+
+class PdfIndexer:
+    def __init__(self, pool, directories=PDF_INDEX_DIRS, workers: int = 2, interval: float = 300.0,
+                 batch_size: int = None, lease: float = 900.0):
+        self.pool = pool
+        self.directories = directories
+        self.workers = workers
+        self.interval = interval
+        self.batch_size = batch_size or workers * 4
+        # Bir partiyani ajratish uchun berilgan vaqt; o'tib ketsa, fayllarni boshqa worker oladi
+        self.lease = lease
+        self._executor = None
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self._lock = threading.Lock()
+        self.stats = {"passes": 0, "indexed": 0, "failed": 0, "removed": 0, "lost": 0, "last_pass_at": None}
+        # Har bir worker o'z yozuvlarida uyg'onadi; boshqa workerlar fayllarni navbatdagi o'tishda ko'radi
+        subscribe(self._on_tables_changed, remote=False)
+
+    def _files(self):
+        for directory in self.directories:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    if name.lower().endswith(".pdf"):
+                        file_path = os.path.join(root, name)
+                        yield "/" + file_path.replace(os.sep, "/"), file_path
+
+    def scan(self, conn) -> set:
+        # Yangi yoki o'zgargan fayllar "pending" deb belgilanadi; to'xtab qolgan o'tish keyin davom etadi.
+        # Qaytaradi: matni olib tashlangan hujjatlar manbalari
+        known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT path, size, mtime FROM pdf_texts")}
+        seen = set()
+        for link, file_path in self._files():
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            seen.add(link)
+            if known.get(link) == (stat.st_size, stat.st_mtime):
+                continue
+            # Boshqa worker shu orada yozgan bo'lsa, o'zgarmagan fayl qayta "pending" bo'lmaydi
+            conn.execute(
+                """
+                INSERT INTO pdf_texts (path, size, mtime, status) VALUES (?, ?, ?, 'pending')
+                ON CONFLICT (path) DO UPDATE SET
+                    size = excluded.size, mtime = excluded.mtime, status = 'pending',
+                    error = NULL, body = NULL, indexed_at = NULL, locked_until = NULL
+                WHERE size != excluded.size OR mtime != excluded.mtime
+                """,
+                (link, stat.st_size, stat.st_mtime),
+            )
+        removed = [link for link in known if link not in seen]
+        sources = set()
+        for link in removed:
+            conn.execute("DELETE FROM pdf_texts WHERE path = ?", (link,))
+            sources |= self._set_body(conn, link, None)
+        conn.commit()
+        self.stats["removed"] += len(removed)
+        return sources
+
+    def _set_body(self, conn, link: str, body) -> set:
+        # documents_fts da link UNINDEXED: yozuvlar triggerlardagi rowid (id * 8 + manba raqami) orqali yangilanadi
+        sources = set()
+        for source, (number, _, _, column) in SEARCH_SOURCES.items():
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM {source} WHERE {column} = ?", (link,))]
+            if ids:
+                conn.executemany(
+                    "UPDATE documents_fts SET body = ? WHERE rowid = ?",
+                    [(body, id * ROWID_STRIDE + number) for id in ids],
+                )
+                sources.add(source)
+        return sources
+
+    def _claim(self, conn) -> tuple:
+        # Muddati o'tgan "running" - to'xtab qolgan workerning fayli, qayta olinadi
+        now = time.time()
+        lease = now + self.lease
+        rows = conn.execute(
+            """
+            UPDATE pdf_texts SET status = 'running', locked_until = ?
+            WHERE path IN (
+                SELECT path FROM pdf_texts
+                WHERE status = 'pending' OR (status = 'running' AND locked_until <= ?)
+                LIMIT ?
+            )
+            RETURNING path
+            """,
+            (lease, now, self.batch_size),
+        ).fetchall()
+        conn.commit()
+        return [row[0] for row in rows], lease
+
+    def _store(self, conn, link: str, lease: float, body: str = None, error: str = None) -> set:
+        # lease - claim paytidagi locked_until: fayl o'zgargan yoki boshqa worker olgan bo'lsa, natija tashlanadi
+        now = datetime.utcnow().isoformat()
+        sources = set()
+        if error is None:
+            cursor = conn.execute(
+                "UPDATE pdf_texts SET status = 'done', body = ?, error = NULL, indexed_at = ?, locked_until = NULL "
+                "WHERE path = ? AND locked_until = ?",
+                (body, now, link, lease),
+            )
+            if cursor.rowcount:
+                sources = self._set_body(conn, link, body)
+                self.stats["indexed"] += 1
+        else:
+            cursor = conn.execute(
+                "UPDATE pdf_texts SET status = 'failed', body = NULL, error = ?, indexed_at = ?, locked_until = NULL "
+                "WHERE path = ? AND locked_until = ?",
+                (error, now, link, lease),
+            )
+            if cursor.rowcount:
+                self.stats["failed"] += 1
+        if not cursor.rowcount:
+            self.stats["lost"] += 1
+        # Har bir fayldan keyin commit: jarayon uzilsa, bajarilgan ish yo'qolmaydi
+        conn.commit()
+        return sources
+
+    def _extract(self, links: list) -> list:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        futures = {self._executor.submit(extract_pdf_text, link.lstrip("/")): link for link in links}
+        results = []
+        for future in as_completed(futures):
+            link = futures[future]
+            try:
+                results.append((link, future.result(), None))
+            except CancelledError:
+                # To'xtatilganda: fayl "running" qoladi va ijara tugagach qayta olinadi
+                continue
+            except Exception as e:
+                logger.warning("PDF text extraction failed for %s: %s", link, e)
+                results.append((link, None, str(e)))
+        return results
+
+    def _notify(self, sources: set):
+        # Keshlar hodisa tsiklida tozalanadi (boshqa workerlarga ham yetkaziladi)
+        if sources and self._loop is not None:
+            self._loop.call_soon_threadsafe(table_changed, "documents_fts", *sorted(sources))
+
+    def run_once(self):
+        with self._lock:
+            with self.pool.connection() as conn:
+                self._notify(self.scan(conn))
+            while True:
+                # Ulanish faqat claim va natijalarni yozish uchun olinadi: PDF ajratilayotganda pool band qilinmaydi
+                with self.pool.connection() as conn:
+                    batch, lease = self._claim(conn)
+                if not batch:
+                    break
+                results = self._extract(batch)
+                sources = set()
+                with self.pool.connection() as conn:
+                    for link, body, error in results:
+                        sources |= self._store(conn, link, lease, body=body, error=error)
+                self._notify(sources)
+            self.stats["passes"] += 1
+            self.stats["last_pass_at"] = datetime.utcnow().isoformat()
+
+    def request(self):
+        # Har qanday oqimdan chaqirish mumkin
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wake.clear()
+            try:
+                await loop.run_in_executor(None, self.run_once)
+            except Exception:
+                logger.exception("PDF indexing pass failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def _on_tables_changed(self, tables):
+        # "documents_fts" bilan kelgan xabar - indeksatorning o'z yozuvi, yangi o'tish kerak emas
+        if "documents_fts" not in tables and any(table in SEARCH_SOURCES for table in tables):
+            self.request()
+
+    async def stop(self):
+        self._loop = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
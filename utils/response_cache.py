@@ -0,0 +1,117 @@
+import json
+import threading
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from utils.cache_backend import call, submit
+from utils.db_events import subscribe
+from utils.http_cache import not_modified, table_versions, validator_headers, versioned
+
+
+class ResponseCache:
+    # Tayyor (serializatsiya qilingan) javoblar keshi; saqlash joyi - utils.cache_backend.
+    # Har bir yozuv o'zi bog'liq jadvallar bilan belgilanadi va ular o'zgarganda o'chiriladi.
+    def __init__(self, backend, ttl: float = 300.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str):
+        entry = await call(self.backend, self.backend.get, key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    async def set(self, key: str, body: bytes, media_type: str, tables, versions: list, ttl: float = None):
+        # versions - handlerdan oldin olingan jadval versiyalari (table_versions): javob tayyorlanayotganda
+        # jadval o'zgargan bo'lsa (boshqa workerda ham), backend uni keshga yozmaydi
+        await call(self.backend, self.backend.set, key, body, media_type, tables, ttl or self.ttl, versions)
+
+    def invalidate(self, *tables: str):
+        # Boshqa workerdan kelgan xabarda ham chaqiriladi: umumiy backend'da takroriy o'chirish zararsiz
+        submit(self.backend, self._invalidate, self.backend, tables)
+
+    def _invalidate(self, backend, tables):
+        removed = backend.invalidate(tables)
+        with self._lock:
+            self.invalidations += removed
+
+    async def stats(self) -> dict:
+        backend = await call(self.backend, self.backend.stats)
+        with self._lock:
+            total = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+        return {**backend, **counters}
+
+
+response_cache = ResponseCache(table_versions.backend)
+subscribe(lambda tables: response_cache.invalidate(*tables))
+
+
+def use_cache_backend(backend):
+    # main.py sozlamasiga ko'ra (CACHE_BACKEND) javoblar va jadval versiyalari uchun backend tanlanadi
+    response_cache.backend = backend
+    table_versions.backend = backend
+
+
+def cached(*tables: str, ttl: float = None):
+    # GET endpoint javobini keshlash: @router.get(...) dan keyin (ichkarida) qo'yiladi.
+    # Keshlangan endpointlar ETag / Last-Modified ham oladi.
+    def decorator(endpoint):
+        endpoint.cache_tables = tables
+        endpoint.cache_ttl = ttl
+        return versioned(*tables)(endpoint)
+    return decorator
+
+
+def cache_key(request: Request) -> str:
+    language = request.headers.get("accept-language", "").split(",")[0].split(";")[0].strip().lower()
+    return json.dumps([request.url.path, sorted(request.query_params.multi_items()), language])
+
+
+class CachedRoute(APIRoute):
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        cache_tables = getattr(self.endpoint, "cache_tables", None)
+        version_tables = getattr(self.endpoint, "version_tables", None)
+        if not cache_tables and not version_tables:
+            return handler
+        ttl = getattr(self.endpoint, "cache_ttl", None)
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+            headers = {}
+            if version_tables:
+                # 304 javobi bog'liqliklar (get_db) va serializatsiyadan oldin qaytariladi
+                versions = await table_versions.versions(version_tables)
+                etag, last_modified = table_versions.validators(versions)
+                headers = validator_headers(etag, last_modified)
+                if not_modified(request, etag, last_modified):
+                    return Response(status_code=304, headers=headers)
+            if cache_tables:
+                key = cache_key(request)
+                entry = await response_cache.get(key)
+                if entry is not None:
+                    body, media_type = entry
+                    return Response(content=body, media_type=media_type, headers=headers)
+                if cache_tables != version_tables:
+                    versions = await table_versions.versions(cache_tables)
+            response = await handler(request)
+            if response.status_code == 200:
+                if cache_tables and hasattr(response, "body"):
+                    await response_cache.set(key, response.body, response.media_type, cache_tables, versions, ttl)
+                response.headers.update(headers)
+            return response
+
+        return cached_handler
@@ -0,0 +1,122 @@
+import re
+from utils.db_events import subscribe
+from utils.pagination import count_cache
+
+# FTS jadvalida rowid = hujjat id * 8 + manba raqami, shuning uchun
+# triggerlar yozuvni to'liq skanersiz rowid orqali yangilaydi va o'chiradi.
+# manba -> (raqam, code ustuni, issuing_authority ustuni, fayl ustuni)
+SEARCH_SOURCES = {
+    "laws": (1, "order_number", "issuing_authority", "link"),
+    "norm_documents": (2, "code", None, "link"),
+    "standards": (3, "code", None, "pdf_link"),
+    "regulations": (4, "code", None, "pdf_link"),
+    "resource_norms": (5, "code", None, "pdf_link"),
+    "reference_docs": (6, None, None, "pdf_link"),
+}
+SOURCE_BY_NUMBER = {number: source for source, (number, *_) in SEARCH_SOURCES.items()}
+ROWID_STRIDE = 8
+
+
+SEARCH_COLUMNS = ["code", "name", "issuing_authority", "link", "body"]
+# Oddiy qidiruv faqat metama'lumotlar bo'yicha, in_body=True bo'lsa PDF matni ham qo'shiladi
+METADATA_COLUMNS = "{code name issuing_authority}"
+
+
+def _values(source: str, prefix: str) -> str:
+    number, code, authority, link = SEARCH_SOURCES[source]
+    column = lambda name: f"{prefix}.{name}" if name else "NULL"
+    # body - utils.pdf_index ajratib olgan PDF matni (pdf_texts jadvalidan)
+    body = f"(SELECT body FROM pdf_texts WHERE path = {prefix}.{link})"
+    return (
+        f"{prefix}.id * {ROWID_STRIDE} + {number}, {column(code)}, {prefix}.name, "
+        f"{column(authority)}, {column(link)}, {body}"
+    )
+
+
+def init_search_index(conn):
+    existing = [row[1] for row in conn.execute("PRAGMA table_info(documents_fts)")]
+    if existing and existing != SEARCH_COLUMNS:
+        # Ustunlar o'zgargan: indeks va triggerlar qaytadan quriladi
+        for source in SEARCH_SOURCES:
+            for action in ("insert", "update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {source}_fts_{action}")
+        conn.execute("DROP TABLE documents_fts")
+    created = existing != SEARCH_COLUMNS
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            code, name, issuing_authority, link UNINDEXED, body,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '1 2 3'
+        )
+    """)
+    columns = "rowid, " + ", ".join(SEARCH_COLUMNS)
+    for source in SEARCH_SOURCES:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {source}_fts_insert AFTER INSERT ON {source} BEGIN
+                INSERT INTO documents_fts ({columns}) VALUES ({_values(source, "new")});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {source}_fts_update AFTER UPDATE ON {source} BEGIN
+                DELETE FROM documents_fts WHERE rowid = old.id * {ROWID_STRIDE} + {SEARCH_SOURCES[source][0]};
+                INSERT INTO documents_fts ({columns}) VALUES ({_values(source, "new")});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {source}_fts_delete AFTER DELETE ON {source} BEGIN
+                DELETE FROM documents_fts WHERE rowid = old.id * {ROWID_STRIDE} + {SEARCH_SOURCES[source][0]};
+            END
+        """)
+    if created:
+        # Kod mosligi nomdan, nom esa organ nomidan muhimroq
+        conn.execute("INSERT INTO documents_fts (documents_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 0.0, 0.5)')")
+        for source in SEARCH_SOURCES:
+            conn.execute(f"INSERT INTO documents_fts ({columns}) SELECT {_values(source, source)} FROM {source}")
+
+
+def build_match_query(text: str, in_body: bool = False) -> str:
+    # "ShNQ 2.01" -> {code name issuing_authority} : ("ShNQ"* "2.01"*)  (har bir so'z prefiks sifatida)
+    tokens = [token for token in re.split(r"\s+", text.strip()) if token]
+    if not tokens:
+        return ""
+    terms = " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+    return terms if in_body else f"{METADATA_COLUMNS} : ({terms})"
+
+
+def _where(match: str, source: str):
+    if source:
+        return "documents_fts MATCH ? AND rowid % ? = ?", (match, ROWID_STRIDE, SEARCH_SOURCES[source][0])
+    return "documents_fts MATCH ?", (match,)
+
+
+def count_documents(conn, match: str, source: str = None) -> int:
+    where, args = _where(match, source)
+    return conn.execute(f"SELECT COUNT(*) FROM documents_fts WHERE {where}", args).fetchone()[0]
+
+
+def search_documents(conn, match: str, limit: int, offset: int, source: str = None) -> list:
+    where, args = _where(match, source)
+    rows = conn.execute(
+        f"SELECT rowid, code, name, issuing_authority, link, "
+        f"snippet(documents_fts, 4, '[', ']', '…', 12) AS snippet FROM documents_fts WHERE {where} "
+        f"ORDER BY rank LIMIT ? OFFSET ?",
+        (*args, limit, offset),
+    ).fetchall()
+    return [
+        {
+            "source": SOURCE_BY_NUMBER[row["rowid"] % ROWID_STRIDE],
+            "id": row["rowid"] // ROWID_STRIDE,
+            "code": row["code"],
+            "name": row["name"],
+            "issuing_authority": row["issuing_authority"],
+            "link": row["link"],
+            "snippet": row["snippet"] or None,
+        } for row in rows
+    ]
+
+
+@subscribe
+def _invalidate_search_counts(tables):
+    # documents_fts - utils.pdf_index PDF matnini yozganda
+    if "documents_fts" in tables or any(table in SEARCH_SOURCES for table in tables):
+        count_cache.invalidate("documents_fts")
@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import time
+from utils.db_events import subscribe
+
+
+class UserCache:
+    # Admin so'rovlari uchun: tekshirilgan tokenlar (token xeshi -> username) va users yozuvlari
+    # qisqa muddat saqlanadi. users jadvali o'zgarsa foydalanuvchilar keshi tozalanadi.
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._users = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _put(self, entries: dict, key, value):
+        entries[key] = value
+        while len(entries) > self.max_entries:
+            entries.pop(next(iter(entries)))
+
+    def _get(self, entries: dict, key):
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def token_subject(self, token: str):
+        return self._get(self._tokens, self._key(token))
+
+    def remember_token(self, token: str, username: str, expires_at=None):
+        # Token muddati tugashidan oldin keshdan chiqadi
+        lifetime = self.ttl if expires_at is None else min(self.ttl, expires_at - time.time())
+        if lifetime > 0:
+            with self._lock:
+                self._put(self._tokens, self._key(token), (username, time.monotonic() + lifetime))
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def user(self, username: str):
+        return self._get(self._users, username)
+
+    def remember_user(self, username: str, user, generation: int):
+        with self._lock:
+            # O'qish paytida users o'zgargan bo'lsa, eski yozuv saqlanmaydi
+            if generation == self._generation:
+                self._put(self._users, username, (user, time.monotonic() + self.ttl))
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tokens": len(self._tokens), "users": len(self._users), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
+
+
+@subscribe
+def _invalidate_users(tables):
+    if "users" in tables:
+        user_cache.invalidate()